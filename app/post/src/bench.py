@@ -0,0 +1,622 @@
+"""Offline replay benchmark: drive ``AutoReplyBot`` against local stand-in APIs.
+
+The stand-ins are small HTTP/1.1 servers on 127.0.0.1 that serve the
+endpoints ``TwitterClient`` and ``ReplyGenerator`` call, replaying a
+recording with optional latency and error injection. They run on their own
+event loop in a background thread, so the bot's loop only does bot work.
+
+A recording is a JSON file::
+
+    {
+      "search": [<GET /2/tweets/search/recent response body>, ...],
+      "classify": ["SKIP", "Good fit", ...],
+      "replies": ["reply text", ...]
+    }
+
+Search pages are served in order, one per request; once exhausted they are
+replayed with shifted tweet ids. Classifier answers and replies are served
+round-robin. Without a recording a synthetic one is generated.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from . import tracing
+from .bot import AutoReplyBot
+from .config import (
+    AppSettings,
+    CacheConfig,
+    DefaultsConfig,
+    HttpConfig,
+    LlmConfig,
+    NearDuplicateConfig,
+    OpenAISettings,
+    OutboxConfig,
+    PostingConfig,
+    PrefilterConfig,
+    TwitterSettings,
+    UsageConfig,
+    get_bots_config,
+)
+from .metrics import REPLIES_POSTED
+from .openai_service import PromptCacheUsage, prompt_cache_report
+from .search import SearchCoordinator
+from .transport import HttpPool
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+_REPLY_MODEL = "bench/reply"
+_CLASSIFIER_MODEL = "bench/classifier"
+_ID_SHIFT = 10**15
+_DRAIN_SECONDS = 30.0
+_WORDS = (
+    "punk strategy token floor chart holders mint burn treasury vault buyback liquidity market "
+    "cycle volume whales community roadmap governance protocol yield staking bridge wallet launch "
+    "art collection rare trait listing bid offer royalty creator onchain gas fees season rally "
+    "dip conviction thesis narrative builders shipping update partnership metrics supply demand"
+).split()
+
+
+@dataclass(slots=True)
+class FaultConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+
+@dataclass(slots=True)
+class Recording:
+    search: list[dict]
+    classify: list[str]
+    replies: list[str]
+
+    @classmethod
+    def load(cls, path: Path) -> "Recording":
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(payload, dict) or not payload.get("search"):
+            raise RuntimeError(f"录制文件缺少 search 页面: {path}")
+        return cls(
+            search=list(payload["search"]),
+            classify=[str(item) for item in payload.get("classify") or ["OK"]],
+            replies=[str(item) for item in payload.get("replies") or ["Thanks for sharing!"]],
+        )
+
+    @classmethod
+    def synthetic(cls, pages: int, tweets_per_page: int, *, seed: int = 0) -> "Recording":
+        rng = random.Random(seed)
+        search: list[dict] = []
+        next_id = 1_800_000_000_000_000_000
+        for _ in range(max(1, pages)):
+            data, users = [], {}
+            for _ in range(tweets_per_page):
+                next_id += rng.randint(1, 1000)
+                author = f"u{rng.randint(1, 500)}"
+                users[author] = {"id": author, "username": f"user_{author}"}
+                data.append(
+                    {
+                        "id": str(next_id),
+                        "text": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 30))),
+                        "author_id": author,
+                        "public_metrics": {
+                            "like_count": rng.randint(0, 500),
+                            "retweet_count": rng.randint(0, 100),
+                            "reply_count": rng.randint(0, 50),
+                            "quote_count": rng.randint(0, 20),
+                        },
+                    }
+                )
+            search.append(
+                {"data": data, "includes": {"users": list(users.values())}, "meta": {"result_count": len(data)}}
+            )
+        classify = ["SKIP", "Good fit", "SKIP", "Relevant question", "Worth a reply"]
+        replies = [
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 45))).capitalize() + "."
+            for _ in range(10)
+        ]
+        return cls(search=search, classify=classify, replies=replies)
+
+
+@dataclass(slots=True)
+class _Reply:
+    status: int
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+    chunks: Optional[list[bytes]] = None
+
+
+class _StandInServer(ABC):
+    """Minimal keep-alive HTTP/1.1 server; subclasses implement ``respond``."""
+
+    def __init__(self, faults: FaultConfig, rng: random.Random, *, chunk_delay: float = 0.0) -> None:
+        self._faults = faults
+        self._rng = rng
+        self._chunk_delay = chunk_delay
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+        self.injected_errors = 0
+
+    @property
+    def origin(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def aclose(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @abstractmethod
+    def respond(self, method: str, path: str, query: dict[str, str], body: bytes) -> _Reply: ...
+
+    def error_reply(self) -> _Reply:
+        return _Reply(503, b'{"error": "injected"}', {"content-type": "application/json"})
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                self.requests += 1
+                delay = self._faults.delay(self._rng)
+                if delay:
+                    await asyncio.sleep(delay)
+                if self._faults.error_rate and self._rng.random() < self._faults.error_rate:
+                    self.injected_errors += 1
+                    reply = self.error_reply()
+                else:
+                    url = urllib.parse.urlsplit(target)
+                    query = dict(urllib.parse.parse_qsl(url.query))
+                    reply = self.respond(method, url.path, query, body)
+                await self._write(writer, reply)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+    async def _write(self, writer: asyncio.StreamWriter, reply: _Reply) -> None:
+        head = [f"HTTP/1.1 {reply.status} {'OK' if reply.status < 400 else 'Error'}"]
+        head.extend(f"{name}: {value}" for name, value in reply.headers.items())
+        if reply.chunks is None:
+            head.append(f"content-length: {len(reply.body)}")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + reply.body)
+            await writer.drain()
+            return
+        head.append("transfer-encoding: chunked")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        for chunk in reply.chunks:
+            writer.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            await writer.drain()
+            if self._chunk_delay:
+                await asyncio.sleep(self._chunk_delay)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+class TwitterStandIn(_StandInServer):
+    """Serves recent search, reply posting and token refresh."""
+
+    def __init__(self, recording: Recording, faults: FaultConfig, rng: random.Random) -> None:
+        super().__init__(faults, rng)
+        self._pages = recording.search
+        self._cursor = 0
+        self.posts = 0
+
+    def error_reply(self) -> _Reply:
+        # Alternate between a server error and a rate-limit rejection.
+        if self._rng.random() < 0.5:
+            return super().error_reply()
+        return _Reply(
+            429,
+            b'{"title": "Too Many Requests"}',
+            {
+                "content-type": "application/json",
+                "x-rate-limit-limit": "450",
+                "x-rate-limit-remaining": "0",
+                "x-rate-limit-reset": str(int(time.time()) + 1),
+            },
+        )
+
+    def respond(self, method: str, path: str, query: dict[str, str], body: bytes) -> _Reply:
+        if method == "GET" and path == "/2/tweets/search/recent":
+            return _json(200, self._next_page())
+        if method == "POST" and path == "/2/tweets":
+            self.posts += 1
+            text = json.loads(body or b"{}").get("text", "")
+            return _json(201, {"data": {"id": str(self.posts), "text": text}})
+        if method == "POST" and path == "/2/oauth2/token":
+            return _json(
+                200,
+                {"access_token": "bench-access", "refresh_token": "bench-refresh", "expires_in": 7200},
+            )
+        return _json(404, {"title": "Not Found"})
+
+    def _next_page(self) -> dict:
+        index = self._cursor % len(self._pages)
+        shift = (self._cursor // len(self._pages)) * _ID_SHIFT
+        self._cursor += 1
+        page = json.loads(json.dumps(self._pages[index]))
+        for item in page.get("data", []):
+            item["id"] = str(int(item["id"]) + shift)
+        page.setdefault("meta", {})["next_token"] = f"bench-{self._cursor}"
+        return page
+
+
+class OpenRouterStandIn(_StandInServer):
+    """Serves ``POST /api/v1/responses`` for the classifier and reply models."""
+
+    def __init__(
+        self, recording: Recording, faults: FaultConfig, rng: random.Random, *, chunk_delay: float = 0.0
+    ) -> None:
+        super().__init__(faults, rng, chunk_delay=chunk_delay)
+        self._classify = recording.classify
+        self._replies = recording.replies
+        self._classify_cursor = 0
+        self._reply_cursor = 0
+        # Mimics provider-side prompt caching: a repeated system prefix is reported as cached.
+        self._warm_prefixes: set[tuple[str, str]] = set()
+
+    def respond(self, method: str, path: str, query: dict[str, str], body: bytes) -> _Reply:
+        if method != "POST" or not path.endswith("/responses"):
+            return _json(404, {"error": "not found"})
+        request = json.loads(body or b"{}")
+        prompt = json.dumps(request.get("input", ""), ensure_ascii=False)
+        if request.get("model") == _CLASSIFIER_MODEL:
+            text = self._classification(request.get("input") or [])
+        else:
+            text = self._replies[self._reply_cursor % len(self._replies)]
+            self._reply_cursor += 1
+        prefix = (str(request.get("model", "")), _system_prefix(request.get("input") or []))
+        cached_tokens = len(prefix[1]) // 4 if prefix in self._warm_prefixes else 0
+        self._warm_prefixes.add(prefix)
+        response = _response_payload(request.get("model", ""), text, len(prompt) // 4, cached_tokens)
+        if not request.get("stream"):
+            return _json(200, response)
+        return _Reply(200, headers={"content-type": "text/event-stream"}, chunks=_sse_events(response, text))
+
+    def _classification(self, messages: list) -> str:
+        content = messages[-1].get("content", "") if messages and isinstance(messages[-1], dict) else ""
+        try:
+            payload = json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            payload = None
+        if isinstance(payload, list):
+            answers = {str(item.get("id")): self._next_answer() for item in payload if isinstance(item, dict)}
+            return json.dumps(answers)
+        return self._next_answer()
+
+    def _next_answer(self) -> str:
+        answer = self._classify[self._classify_cursor % len(self._classify)]
+        self._classify_cursor += 1
+        return answer
+
+
+def _json(status: int, payload: dict) -> _Reply:
+    return _Reply(status, json.dumps(payload).encode("utf-8"), {"content-type": "application/json"})
+
+
+def _system_prefix(messages: list) -> str:
+    parts: list[str] = []
+    for message in messages:
+        if not isinstance(message, dict) or message.get("role") != "system":
+            break
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _response_payload(model: str, text: str, input_tokens: int, cached_tokens: int = 0) -> dict:
+    output_tokens = max(1, len(text) // 4)
+    return {
+        "id": "resp_bench",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_bench",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_tokens_details": {"cached_tokens": min(cached_tokens, input_tokens)},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+def _sse_events(response: dict, text: str) -> list[bytes]:
+    def event(payload: dict) -> bytes:
+        return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+    started = {**response, "status": "in_progress", "output": []}
+    events = [event({"type": "response.created", "sequence_number": 0, "response": started})]
+    for index, word in enumerate(text.split(" ")):
+        events.append(
+            event(
+                {
+                    "type": "response.output_text.delta",
+                    "sequence_number": index + 1,
+                    "item_id": "msg_bench",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": word if index == 0 else f" {word}",
+                    "logprobs": [],
+                }
+            )
+        )
+    events.append(event({"type": "response.completed", "sequence_number": len(events), "response": response}))
+    return events
+
+
+class StandIns:
+    """Run both stand-in servers on a private event loop in a daemon thread."""
+
+    def __init__(
+        self,
+        recording: Recording,
+        *,
+        twitter_faults: FaultConfig,
+        llm_faults: FaultConfig,
+        llm_chunk_delay: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.twitter = TwitterStandIn(recording, twitter_faults, random.Random(seed))
+        self.openrouter = OpenRouterStandIn(
+            recording, llm_faults, random.Random(seed + 1), chunk_delay=llm_chunk_delay
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="bench-stand-ins", daemon=True)
+
+    @property
+    def twitter_base(self) -> str:
+        return f"{self.twitter.origin}/2"
+
+    @property
+    def openrouter_base(self) -> str:
+        return f"{self.openrouter.origin}/api/v1"
+
+    def __enter__(self) -> "StandIns":
+        self._thread.start()
+        self._call(self.twitter.start())
+        self._call(self.openrouter.start())
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._call(self.twitter.aclose())
+        self._call(self.openrouter.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def _call(self, coro) -> None:
+        asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=10)
+
+
+@dataclass(slots=True)
+class BenchReport:
+    cycles: int
+    tweets: int
+    replies: int
+    elapsed: float
+    latencies: list[float]
+    peak_rss_bytes: Optional[int]
+    twitter_requests: int
+    llm_requests: int
+    injected_errors: int
+    failed_cycles: int = 0
+    prompt_cache: list[PromptCacheUsage] = field(default_factory=list)
+
+    @property
+    def tweets_per_second(self) -> float:
+        return self.tweets / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+        return ordered[rank]
+
+
+def bench_settings(workdir: Path, twitter_base: str, *, cache_enabled: Optional[bool] = None) -> AppSettings:
+    """Settings for the benchmark bot: tunables from config.yml, endpoints and state local."""
+    config = get_bots_config()
+    defaults = config.defaults if config is not None else DefaultsConfig()
+    persona = next(iter(config.personas.values()), None) if config is not None else None
+    cache = config.cache if config is not None else CacheConfig()
+    twitter = TwitterSettings(
+        client_id="bench",
+        client_secret="bench",
+        access_token="bench-access",
+        refresh_token="bench-refresh",
+        search_query="bench",
+        scopes=(),
+        handle="bench",
+        persona=persona.name if persona else "bench",
+        api_base=twitter_base,
+    )
+    openai_settings = OpenAISettings(
+        model=_REPLY_MODEL,
+        classifier_model=_CLASSIFIER_MODEL,
+        reply_style_prompt=persona.reply_prompt if persona else "Reply briefly.",
+        classification_prompt=persona.classifier_prompt if persona else "Answer SKIP or OK.",
+        api_key="bench",
+        reply_max_output_tokens=config.models.reply_max_output_tokens if config else 512,
+        stream_replies=config.models.stream_replies if config else True,
+        persona=persona.name if persona else "bench",
+    )
+    return AppSettings(
+        twitter=twitter,
+        openai=openai_settings,
+        state_path=str(workdir / "state_bench.sqlite3"),
+        token_store_path=str(workdir / "token_bench.json"),
+        outbox_path=str(workdir / "outbox_bench.sqlite3"),
+        max_tweets_per_run=defaults.max_tweets_per_run,
+        max_pages_per_run=defaults.max_pages_per_run,
+        search_page_size=defaults.search_page_size,
+        llm_concurrency=defaults.llm_concurrency,
+        classifier_batch_size=defaults.classifier_batch_size,
+        dedup_history=defaults.dedup_history,
+        cache=CacheConfig(
+            enabled=cache.enabled if cache_enabled is None else cache_enabled,
+            path=str(workdir / "llm_cache.sqlite3"),
+            ttl_seconds=cache.ttl_seconds,
+            max_entries=cache.max_entries,
+            cache_replies=cache.cache_replies,
+        ),
+        http=config.http if config is not None else HttpConfig(),
+        prefilter=config.prefilter if config is not None else PrefilterConfig(),
+        near_duplicates=config.near_duplicates if config is not None else NearDuplicateConfig(),
+        llm=config.llm if config is not None else LlmConfig(),
+        # Keep bench traffic out of the real token ledger.
+        usage=UsageConfig(path=str(workdir / "usage_bench.sqlite3")),
+        # Retries after injected errors must finish within the run.
+        outbox=OutboxConfig(base_delay_seconds=0.05, max_delay_seconds=0.5),
+        # The write budget would stall a replay after a few dozen replies.
+        posting=PostingConfig(enabled=False),
+    )
+
+
+async def _drive(settings: AppSettings, stand_ins: StandIns, cycles: int) -> tuple[int, int, int, float]:
+    pool = HttpPool(settings.http)
+    llm_client = AsyncOpenAI(
+        api_key="bench", base_url=stand_ins.openrouter_base, http_client=pool.client, max_retries=0
+    )
+    # Go through the coordinator like `run` does, so pages stream the same way.
+    search = SearchCoordinator()
+    bot = AutoReplyBot(settings, http=pool.client, llm_client=llm_client, search=search)
+    posted_before = REPLIES_POSTED.value(handle="bench")
+    tweets = failed = 0
+    started = time.perf_counter()
+    bot.start_poster()
+    try:
+        for cycle in range(cycles):
+            try:
+                result = await bot.run_cycle()
+            except Exception as exc:
+                # The bot backs off and tries again next cycle; so does the bench.
+                failed += 1
+                logger.warning("Bench cycle %s/%s failed: %s", cycle + 1, cycles, exc)
+                continue
+            tweets += result.fetched
+            logger.info("Bench cycle %s/%s done", cycle + 1, cycles)
+        # Posting runs behind drafting; the run ends once the outbox is drained.
+        await bot.drain_outbox(_DRAIN_SECONDS)
+    finally:
+        elapsed = time.perf_counter() - started
+        await bot.stop_poster()
+        await search.aclose()
+        await bot.aclose()
+        await pool.aclose()
+    return tweets, int(REPLIES_POSTED.value(handle="bench") - posted_before), failed, elapsed
+
+
+def run_benchmark(
+    recording: Recording,
+    *,
+    cycles: int,
+    twitter_faults: FaultConfig,
+    llm_faults: FaultConfig,
+    llm_chunk_delay: float = 0.0,
+    cache_enabled: Optional[bool] = None,
+    seed: int = 0,
+) -> BenchReport:
+    """Replay ``recording`` through a fresh bot for ``cycles`` cycles."""
+    with tempfile.TemporaryDirectory(prefix="bot-bench-") as tmp, StandIns(
+        recording,
+        twitter_faults=twitter_faults,
+        llm_faults=llm_faults,
+        llm_chunk_delay=llm_chunk_delay,
+        seed=seed,
+    ) as stand_ins:
+        workdir = Path(tmp)
+        settings = bench_settings(workdir, stand_ins.twitter_base, cache_enabled=cache_enabled)
+        # Per-tweet latency comes from the root "tweet" spans.
+        trace_path = workdir / "spans.jsonl"
+        tracing.configure(str(trace_path))
+        try:
+            tweets, replies, failed, elapsed = asyncio.run(_drive(settings, stand_ins, cycles))
+        finally:
+            tracing.shutdown()
+        latencies = _tweet_latencies(trace_path)
+        return BenchReport(
+            cycles=cycles,
+            failed_cycles=failed,
+            tweets=tweets,
+            replies=replies,
+            elapsed=elapsed,
+            latencies=latencies,
+            peak_rss_bytes=_peak_rss_bytes(),
+            twitter_requests=stand_ins.twitter.requests,
+            llm_requests=stand_ins.openrouter.requests,
+            injected_errors=stand_ins.twitter.injected_errors + stand_ins.openrouter.injected_errors,
+            prompt_cache=prompt_cache_report(settings.openai.persona),
+        )
+
+
+def _tweet_latencies(path: Path) -> list[float]:
+    latencies: list[float] = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            span = json.loads(line)
+            if span.get("name") != "tweet":
+                continue
+            latencies.append((int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9)
+    return latencies
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
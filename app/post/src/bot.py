@@ -1,162 +1,781 @@
 """High-level orchestration of the Twitter auto-reply workflow."""
 
+import asyncio
 import logging
+import random
 import time
-from threading import Event
-from typing import Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Union
 
+import httpx
+from openai import AsyncOpenAI
+
+from . import tracing
+from .cache import ResponseCache
 from .config import AppSettings
-from .openai_service import ReplyGenerator, TweetContext
-from .storage import Storage
-from .twitter_service import Tweet, TwitterClient
+from .dedup import CycleClusters, NearDuplicateIndex
+from .metrics import (
+    CYCLE_DURATION,
+    CYCLE_FAILURES,
+    OUTBOX_PENDING,
+    REPLIES_POSTED,
+    REPLY_FAILURES,
+    REPLY_RETRIES,
+    TWEETS_FETCHED,
+    TOKEN_BUDGET_REMAINING,
+    TWEETS_SKIPPED,
+    WRITE_BUDGET_REMAINING,
+)
+from .openai_service import ReplyGenerator, TweetContext, prompt_cache_report
+from .outbox import OutboxEntry, ReplyOutbox
+from .polling import AdaptivePollInterval
+from .prefilter import DROP, FAST_TRACK, Prefilter
+from .rate_limit import RateLimitBudget, RateLimiter
+from .resilience import CircuitOpenError, ModelGuard, is_transient
+from .search import SearchCoordinator
+from .shaper import DEFER, DROP as SHAPER_DROP, WriteShaper
+from .storage import BotState, Storage
+from .twitter_service import SEARCH_ENDPOINT, Tweet, TwitterClient
+from .usage import UsageLedger
 
 
 logger = logging.getLogger(__name__)
+# Statuses worth another attempt; any other 4xx means Twitter will never accept the reply.
+_TRANSIENT_STATUSES = {401, 408, 429}
+# First delay after a failed cycle; doubles per consecutive failure up to the poll interval.
+_CYCLE_RETRY_BASE_SECONDS = 30.0
+# How long shutdown waits for the post in flight before cancelling the poster.
+_POSTER_STOP_TIMEOUT_SECONDS = 10.0
+
+# A drafted reply, ``None`` when the model declined, or the error that stopped the LLM call.
+Draft = Union[str, Exception, None]
+
+
+@dataclass(slots=True)
+class CycleResult:
+    fetched: int
+    queued: int
 
 
 class AutoReplyBot:
-    def __init__(self, settings: AppSettings, dry_run: bool = False) -> None:
+    def __init__(
+        self,
+        settings: AppSettings,
+        dry_run: bool = False,
+        *,
+        http: Optional[httpx.AsyncClient] = None,
+        llm_client: Optional[AsyncOpenAI] = None,
+        cache: Optional[ResponseCache] = None,
+        search: Optional[SearchCoordinator] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        guard: Optional[ModelGuard] = None,
+        ledger: Optional[UsageLedger] = None,
+    ) -> None:
         self._settings = settings
-        self._storage = Storage(settings.state_path, settings.token_store_path)
+        self._metric_handle = settings.twitter.handle.lower().lstrip("@")
+        self._storage = Storage(
+            settings.state_path,
+            settings.token_store_path,
+            max_history=settings.dedup_history,
+        )
+        self._outbox = ReplyOutbox(
+            settings.outbox_path,
+            base_delay=settings.outbox.base_delay_seconds,
+            max_delay=settings.outbox.max_delay_seconds,
+            max_attempts=settings.outbox.max_attempts,
+            sent_retention=max(86400.0, settings.posting.window_seconds),
+        )
+        self._shaper = WriteShaper(
+            settings.posting,
+            self._outbox.sent_since(time.time() - settings.posting.window_seconds),
+        )
+        self._outbox_ready = asyncio.Event()
+        self._stopping = False
+        self._poster: Optional[asyncio.Task] = None
+        self._state: Optional[BotState] = None
         self._dry_run = dry_run
+        self._owns_cache = cache is None and settings.cache.enabled
+        if self._owns_cache:
+            cache = ResponseCache(
+                settings.cache.path,
+                ttl_seconds=settings.cache.ttl_seconds,
+                max_entries=settings.cache.max_entries,
+            )
+        self._cache = cache
+        self._owns_ledger = ledger is None and settings.usage.enabled
+        if self._owns_ledger:
+            ledger = UsageLedger(settings.usage.path, hourly_retention_days=settings.usage.hourly_retention_days)
+        self._ledger = ledger
+        self._token_budget = settings.usage.budget_for(self._metric_handle)
         if settings.openai.api_key:
-            self._reply_generator = ReplyGenerator(settings.openai)
+            self._reply_generator = ReplyGenerator(
+                settings.openai,
+                client=llm_client,
+                cache=cache,
+                cache_replies=settings.cache.cache_replies,
+                handle=settings.twitter.handle,
+                guard=guard or ModelGuard(settings.llm),
+                ledger=ledger,
+            )
         else:
             self._reply_generator = None
             logger.warning(
                 "OpenRouter API key is not configured; tweets will be logged but no replies will be posted."
             )
-        self._twitter = TwitterClient(settings.twitter, self._storage)
+        self._twitter = TwitterClient(
+            settings.twitter,
+            self._storage,
+            http=http,
+            rate_limiter=rate_limiter,
+        )
+        self._llm_slots = asyncio.Semaphore(max(1, settings.llm_concurrency))
+        self._poll = AdaptivePollInterval(
+            settings.poll_interval_seconds,
+            min_seconds=settings.min_poll_interval_seconds,
+            max_seconds=settings.max_poll_interval_seconds,
+        )
+        self._tweet_spans: dict[int, tracing.Span] = {}
+        self._queued_spans: dict[int, tracing.Span] = {}
+        self._prefilter = Prefilter(settings.prefilter)
+        near_duplicates = settings.near_duplicates
+        self._near_duplicates: Optional[NearDuplicateIndex] = None
+        if near_duplicates.enabled:
+            self._near_duplicates = NearDuplicateIndex(
+                capacity=near_duplicates.capacity,
+                window_seconds=near_duplicates.window_seconds,
+                max_distance=near_duplicates.max_distance,
+            )
+        self._search = search
+        if search is not None:
+            search.subscribe(self.handle, settings.twitter.search_query)
+
+    @property
+    def handle(self) -> str:
+        return self._settings.twitter.handle
+
+    def search_budget(self) -> Optional[RateLimitBudget]:
+        return self._twitter.rate_limit_budget(SEARCH_ENDPOINT)
+
+    async def aclose(self) -> None:
+        await self._twitter.aclose()
+        self._storage.close()
+        self._outbox.close()
+        if self._owns_cache and self._cache is not None:
+            self._cache.close()
+        if self._owns_ledger and self._ledger is not None:
+            self._ledger.close()
+        elif self._ledger is not None:
+            self._ledger.flush()
 
-    def run(self, stop_event: Optional[Event] = None) -> None:
-        interval = self._settings.poll_interval_seconds
-        logger.info("Auto-reply bot started; polling every %s seconds", interval)
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        self.start_poster()
+        try:
+            await self._run_cycles(stop_event)
+        finally:
+            await self.stop_poster()
+
+    async def run_cycle(self) -> CycleResult:
+        """Search, classify and draft once; replies go to the outbox for the poster."""
+        with tracing.span("cycle", attributes={"bot.handle": self._metric_handle}) as cycle_span:
+            result = await self._process_cycle()
+            cycle_span.set_attribute("bot.replies_queued", result.queued)
+        return result
+
+    def start_poster(self) -> None:
+        """Start posting queued replies in the background."""
+        if self._poster is None:
+            self._stopping = False
+            self._poster = asyncio.create_task(self._run_poster(), name=f"poster-{self._metric_handle}")
+
+    async def drain_outbox(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the outbox to empty; return whether it did."""
+        deadline = time.monotonic() + timeout
+        while len(self._outbox) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return not len(self._outbox)
+
+    async def stop_poster(self) -> None:
+        """Finish the post in flight; queued replies stay in the outbox for the next start."""
+        poster, self._poster = self._poster, None
+        if poster is None:
+            return
+        self._stopping = True
+        self._outbox_ready.set()
+        done, _ = await asyncio.wait({poster}, timeout=_POSTER_STOP_TIMEOUT_SECONDS)
+        if not done:
+            logger.warning("Reply poster still busy after %.0f seconds; cancelling it", _POSTER_STOP_TIMEOUT_SECONDS)
+            poster.cancel()
+        try:
+            await poster
+        except asyncio.CancelledError:
+            if not done:
+                return
+            raise
+
+    async def _run_cycles(self, stop_event: Optional[asyncio.Event]) -> None:
+        interval = self._poll.current
+        logger.info(
+            "Auto-reply bot started; polling every %s seconds (adaptive range %s-%s)",
+            interval,
+            self._settings.min_poll_interval_seconds,
+            self._settings.max_poll_interval_seconds,
+        )
         if self._dry_run:
             logger.info("Dry run mode enabled; replies will not be posted to Twitter")
+        failures = 0
         while True:
             if stop_event and stop_event.is_set():
                 logger.info("Stop signal received; exiting bot loop")
                 return
-            replies = self._process_cycle()
-            logger.info("Cycle complete. Replies sent: %s", replies)
-            logger.info("Sleeping for %s seconds", interval)
-            if stop_event:
-                if stop_event.wait(interval):
-                    logger.info("Stop signal received; exiting bot loop")
+            hits_before, misses_before = self._cache_counts()
+            started = time.perf_counter()
+            try:
+                result = await self.run_cycle()
+            except Exception as exc:
+                # A search that failed past its retries (5xx, transport error,
+                # 401 after a failed refresh) must not end the account's bot.
+                failures += 1
+                delay = self._failure_backoff(failures)
+                CYCLE_FAILURES.inc(handle=self._metric_handle)
+                logger.warning(
+                    "Cycle failed (%s in a row): %s; retrying in %.0f seconds",
+                    failures,
+                    exc,
+                    delay,
+                    exc_info=not isinstance(exc, httpx.HTTPError),
+                )
+                if await self._wait(stop_event, delay):
                     return
-            else:
-                time.sleep(interval)
+                continue
+            failures = 0
+            CYCLE_DURATION.observe(time.perf_counter() - started, handle=self._metric_handle)
+            logger.info("Cycle complete. Replies queued: %s (%s waiting in outbox)", result.queued, len(self._outbox))
+            budget = self.search_budget()
+            if budget is not None:
+                logger.info(
+                    "Search rate limit: %s/%s remaining, resets in %.0f seconds",
+                    budget.remaining,
+                    budget.limit,
+                    budget.seconds_until_reset(),
+                )
+            if self._cache is not None:
+                hits, misses = self._cache_counts()
+                logger.info(
+                    "LLM cache: %s hits, %s misses this cycle",
+                    hits - hits_before,
+                    misses - misses_before,
+                )
+            self._log_prompt_cache()
+            self._log_token_usage()
+            interval = self._poll.observe(
+                fetched=result.fetched,
+                capacity=self._settings.max_tweets_per_run,
+                requests_per_cycle=max(1, -(-result.fetched // self._settings.search_page_size)),
+                budget=budget,
+            )
+            logger.info("Sleeping for %.0f seconds", interval)
+            if await self._wait(stop_event, interval):
+                return
+
+    async def _wait(self, stop_event: Optional[asyncio.Event], seconds: float) -> bool:
+        """Sleep ``seconds``; return True when ``stop_event`` fired in the meantime."""
+        if stop_event is None:
+            await asyncio.sleep(seconds)
+            return False
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return False
+        logger.info("Stop signal received; exiting bot loop")
+        return True
 
-    def _process_cycle(self) -> int:
+    def _failure_backoff(self, failures: int) -> float:
+        """Jittered exponential delay after a failed cycle, capped at the poll interval."""
+        ceiling = min(self._poll.current, _CYCLE_RETRY_BASE_SECONDS * 2 ** (failures - 1))
+        delay = random.uniform(ceiling / 2, ceiling)
+        budget = self.search_budget()
+        if budget is not None and budget.remaining is not None and budget.remaining <= 0:
+            delay = max(delay, budget.seconds_until_reset())
+        return delay
+
+    async def _process_cycle(self) -> CycleResult:
         logger.info("Fetching tweets for query %r", self._settings.twitter.search_query)
-        state = self._storage.load_state()
-        tweets = self._twitter.fetch_recent_tweets(
-            max_results=self._settings.max_tweets_per_run,
-            since_id=state.last_seen_id,
-        )
-        if not tweets:
-            logger.info("No tweets found for query %r", self._settings.twitter.search_query)
-            self._storage.save_state(state)
-            return 0
+        # The dedup history is loaded once; afterwards only new ids and the
+        # search cursor are written back.
+        if self._state is None:
+            self._state = self._storage.load_state()
+        state = self._state
 
-        processed = set(state.processed_ids)
-        replies_sent = 0
+        processed = state.processed_ids
+        replies_queued = 0
         highest_seen_id = state.last_seen_id or 0
+        fetched = 0
 
-        logger.info("Fetched %s tweets", len(tweets))
         bot_usernames = set(self._settings.twitter.bot_usernames)
-        for tweet in tweets:
-            highest_seen_id = max(highest_seen_id, tweet.id)
-            if tweet.id in processed:
-                logger.debug("Skipping already processed tweet %s", tweet.id)
+        batch_size = max(1, self._settings.classifier_batch_size)
+        candidates: list[Tweet] = []
+        queued: set[int] = set()
+        batch: list[Tweet] = []
+        drafting: list[asyncio.Task] = []
+        clusters = CycleClusters(self._near_duplicates) if self._near_duplicates is not None else None
+        self._tweet_spans.clear()
+        waiting_since = time.time_ns()
+        try:
+            # Classification starts as soon as a batch fills up, while later
+            # search pages are still being fetched.
+            async for page in self._iter_pages(state.last_seen_id):
+                # Most popular first, so a page's cluster leader is drafted
+                # before any near-duplicate that would supersede it.
+                page = sorted(page, key=lambda tweet: (tweet.popularity_score, tweet.id), reverse=True)
+                for tweet in page:
+                    fetched += 1
+                    highest_seen_id = max(highest_seen_id, tweet.id)
+                    if tracing.enabled():
+                        arrived = time.time_ns()
+                        self._start_tweet_trace(tweet, waiting_since, arrived)
+                        waiting_since = arrived
+                    if tweet.id in processed or tweet.id in queued or tweet.id in self._outbox:
+                        logger.debug("Skipping already processed tweet %s", tweet.id)
+                        TWEETS_SKIPPED.inc(handle=self._metric_handle, reason="already_processed")
+                        if tweet.id not in queued:
+                            self._finish_tweet_trace(tweet.id, "already_processed")
+                        continue
+                    if bot_usernames and tweet.author_handle.lower() in bot_usernames:
+                        logger.debug("Skipping bot-authored tweet %s", tweet.id)
+                        self._skip(state, tweet.id, "bot_author")
+                        continue
+                    verdict = self._prefilter.evaluate(tweet)
+                    if verdict.action == DROP:
+                        logger.info(
+                            "Skipping tweet %s (@%s) | prefilter=%s",
+                            tweet.id,
+                            tweet.author_handle,
+                            verdict.reason,
+                        )
+                        self._skip(state, tweet.id, "prefilter")
+                        continue
+                    duplicate_of = clusters.admit(tweet) if clusters is not None else None
+                    if duplicate_of is not None:
+                        logger.info(
+                            "Skipping tweet %s (@%s) | near_duplicate_of=%s",
+                            tweet.id,
+                            tweet.author_handle,
+                            duplicate_of,
+                        )
+                        self._skip(state, tweet.id, "near_duplicate")
+                        continue
+                    preview = " ".join(tweet.text.split())
+                    logger.info("Processing tweet %s by @%s: %s", tweet.id, tweet.author_handle, preview)
+                    if self._reply_generator is None:
+                        logger.info(
+                            "Skipping reply for tweet %s (@%s) because no OpenRouter API key is configured.",
+                            tweet.id,
+                            tweet.author_handle,
+                        )
+                        self._skip(state, tweet.id, "no_api_key")
+                        continue
+                    tokens_left = self._token_budget_left(tweet)
+                    if tokens_left is not None:
+                        logger.info(
+                            "Skipping tweet %s (@%s) | token_budget (%s tokens left today, score %.0f)",
+                            tweet.id,
+                            tweet.author_handle,
+                            tokens_left,
+                            tweet.popularity_score,
+                        )
+                        self._skip(state, tweet.id, "token_budget")
+                        continue
+                    candidates.append(tweet)
+                    queued.add(tweet.id)
+                    if verdict.action == FAST_TRACK:
+                        drafting.append(
+                            asyncio.create_task(self._draft_fast_tracked(tweet, f"prefilter:{verdict.reason}"))
+                        )
+                        continue
+                    batch.append(tweet)
+                    if len(batch) >= batch_size:
+                        drafting.append(asyncio.create_task(self._draft_batch(batch)))
+                        batch = []
+            if batch:
+                drafting.append(asyncio.create_task(self._draft_batch(batch)))
+            results = await asyncio.gather(*drafting)
+        except BaseException:
+            for task in drafting:
+                task.cancel()
+            raise
+
+        TWEETS_FETCHED.inc(fetched, handle=self._metric_handle)
+        if not fetched:
+            logger.info("No tweets found for query %r", self._settings.twitter.search_query)
+            return CycleResult(fetched=0, queued=0)
+        logger.info("Fetched %s tweets", fetched)
+
+        drafts: dict[int, Draft] = {}
+        deferred: list[int] = []
+        for batch_drafts in results:
+            drafts.update(batch_drafts)
+        # Posting keeps popularity order across all fetched pages.
+        candidates.sort(key=lambda tweet: (tweet.popularity_score, tweet.id), reverse=True)
+
+        for tweet in candidates:
+            if clusters is not None and tweet.id in clusters.superseded:
+                # A more popular near-duplicate arrived later in the cycle.
+                logger.info("Skipping tweet %s (@%s) | near_duplicate_superseded", tweet.id, tweet.author_handle)
+                self._skip(state, tweet.id, "near_duplicate")
                 continue
-            if bot_usernames and tweet.author_handle.lower() in bot_usernames:
-                logger.debug("Skipping bot-authored tweet %s", tweet.id)
-                processed.add(tweet.id)
-                state.processed_ids.append(tweet.id)
+            reply = drafts.get(tweet.id)
+            if isinstance(reply, Exception):
+                if is_transient(reply):
+                    # The model was unreachable or its breaker open: leave the
+                    # tweet unmarked so it is searched and drafted again.
+                    TWEETS_SKIPPED.inc(handle=self._metric_handle, reason="deferred")
+                    self._finish_tweet_trace(tweet.id, "deferred")
+                    deferred.append(tweet.id)
+                else:
+                    self._skip(state, tweet.id, "llm_error")
                 continue
-            preview = " ".join(tweet.text.split())
-            logger.info("Processing tweet %s by @%s: %s", tweet.id, tweet.author_handle, preview)
-            if self._reply_generator is None:
-                logger.info(
-                    "Skipping reply for tweet %s (@%s) because no OpenRouter API key is configured.",
-                    tweet.id,
-                    tweet.author_handle,
-                )
-                processed.add(tweet.id)
-                state.processed_ids.append(tweet.id)
+            if not reply:
+                self._skip(state, tweet.id, "declined")
+                continue
+            logger.info("Reply content for tweet %s: %s", tweet.id, reply)
+            if self._dry_run:
+                logger.info("Dry run enabled; not posting reply for tweet %s", tweet.id)
+                self._skip(state, tweet.id, "dry_run")
                 continue
+            # The poster task takes it from here; the tweet root span stays
+            # open until the reply is posted or given up on.
+            self._outbox.enqueue(tweet.id, reply, priority=tweet.popularity_score)
+            root = self._tweet_spans.pop(tweet.id, None)
+            if root is not None:
+                self._queued_spans[tweet.id] = root
+            replies_queued += 1
+
+        if replies_queued:
+            OUTBOX_PENDING.set(len(self._outbox), handle=self._metric_handle)
+            self._outbox_ready.set()
+        if deferred:
+            # Hold the cursor below the deferred tweets; the ones after them
+            # are already in ``processed`` and get skipped on the refetch.
+            logger.info("Deferring %s tweets to the next cycle; the LLM is unavailable", len(deferred))
+            highest_seen_id = min(highest_seen_id, min(deferred) - 1)
+        if highest_seen_id and highest_seen_id != state.last_seen_id:
+            state.last_seen_id = highest_seen_id
+            self._storage.save_last_seen(highest_seen_id)
+        return CycleResult(fetched=fetched, queued=replies_queued)
 
-            should_reply, classifier_note = self._should_reply(tweet)
-            if not should_reply:
+    # Outbox posting ----------------------------------------------------
+    async def _run_poster(self) -> None:
+        """Post queued replies as they come due, independently of the polling cycle."""
+        while not self._stopping:
+            self._outbox_ready.clear()
+            deferred = await self._post_due()
+            timeout = deferred if deferred is not None else self._outbox.seconds_until_due()
+            try:
+                await asyncio.wait_for(self._outbox_ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _post_due(self) -> Optional[float]:
+        """Post due replies, most popular first, while the write budget allows.
+
+        Returns how long to wait when the shaper deferred the best remaining reply.
+        """
+        deferred: Optional[float] = None
+        max_age = self._settings.outbox.max_age_seconds
+        while not self._stopping:
+            entry = self._outbox.next_due()
+            if entry is None:
+                break
+            if max_age and time.time() - entry.created_at > max_age:
+                logger.warning(
+                    "Dropping queued reply to tweet %s after %s attempts: too old", entry.tweet_id, entry.attempts
+                )
+                self._settle(entry.tweet_id, "expired")
+                continue
+            decision = self._shaper.decide(entry.priority)
+            if decision.action == DEFER:
+                logger.info(
+                    "Write budget low (%s left); deferring reply to tweet %s (score %.0f) for %.0f seconds",
+                    self._shaper.remaining(),
+                    entry.tweet_id,
+                    entry.priority,
+                    decision.delay,
+                )
+                deferred = decision.delay
+                break
+            if decision.action == SHAPER_DROP:
                 logger.info(
-                    "Skipping tweet %s (@%s) | classifier=%s",
-                    tweet.id,
-                    tweet.author_handle,
-                    classifier_note,
+                    "Write budget low (%s left); dropping reply to tweet %s (score %.0f)",
+                    self._shaper.remaining(),
+                    entry.tweet_id,
+                    entry.priority,
                 )
-                processed.add(tweet.id)
-                state.processed_ids.append(tweet.id)
+                self._settle(entry.tweet_id, "low_value")
                 continue
+            try:
+                await self._post_entry(entry)
+            except Exception as exc:  # pragma: no cover - e.g. token refresh failures
+                logger.exception("Unexpected error posting reply to tweet %s", entry.tweet_id)
+                self._retry_later(entry, f"{type(exc).__name__}: {exc}")
+        OUTBOX_PENDING.set(len(self._outbox), handle=self._metric_handle)
+        remaining = self._shaper.remaining()
+        if remaining is not None:
+            WRITE_BUDGET_REMAINING.set(remaining, handle=self._metric_handle)
+        return deferred
+
+    async def _post_entry(self, entry: OutboxEntry) -> None:
+        tweet_id = entry.tweet_id
+        try:
+            logger.info("Posting reply to tweet %s (attempt %s)", tweet_id, entry.attempts + 1)
+            with tracing.span(
+                "post",
+                parent=self._queued_spans.get(tweet_id),
+                trace_id=tracing.trace_id_for(tweet_id),
+                attributes={"bot.attempt": entry.attempts + 1},
+            ):
+                await self._twitter.post_reply(tweet_id, entry.reply)
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code
+            if entry.attempts and status == 403 and "duplicate" in exc.response.text.lower():
+                # An earlier attempt that looked failed was accepted after all.
+                logger.info("Reply to tweet %s was already posted by an earlier attempt", tweet_id)
+            elif status in _TRANSIENT_STATUSES or status >= 500:
+                self._retry_later(entry, f"HTTP {status}")
+                return
+            else:
+                logger.error("Twitter rejected reply to tweet %s with %s; dropping it", tweet_id, status)
+                self._settle(tweet_id, "rejected")
+                return
+        except httpx.TransportError as exc:
+            self._retry_later(entry, f"{type(exc).__name__}: {exc}")
+            return
+        self._settle(tweet_id, "replied")
+
+    def _retry_later(self, entry: OutboxEntry, error: str) -> None:
+        delay = self._outbox.retry_later(entry, error)
+        if delay is None:
+            logger.error("Giving up on reply to tweet %s after %s attempts (%s)", entry.tweet_id, entry.attempts, error)
+            self._settle(entry.tweet_id, "post_failed")
+            return
+        REPLY_RETRIES.inc(handle=self._metric_handle)
+        logger.warning(
+            "Posting reply to tweet %s failed (%s); retrying in %.1f seconds", entry.tweet_id, error, delay
+        )
+
+    def _settle(self, tweet_id: int, outcome: str) -> None:
+        """Take a reply out of the outbox for good and never draft that tweet again."""
+        if self._state is not None:
+            self._state.processed_ids.add(tweet_id)
+        self._storage.mark_processed(tweet_id)
+        if outcome == "replied":
+            self._outbox.mark_sent(tweet_id)
+            self._shaper.record()
+            REPLIES_POSTED.inc(handle=self._metric_handle)
+        else:
+            self._outbox.remove(tweet_id)
+            REPLY_FAILURES.inc(handle=self._metric_handle, reason=outcome)
+        root = self._queued_spans.pop(tweet_id, None)
+        if root is not None:
+            root.set_attribute("bot.outcome", outcome)
+            root.end()
+
+    def _mark_processed(self, state: BotState, tweet_id: int) -> None:
+        state.processed_ids.add(tweet_id)
+        self._storage.mark_processed(tweet_id)
+
+    def _skip(self, state: BotState, tweet_id: int, reason: str) -> None:
+        TWEETS_SKIPPED.inc(handle=self._metric_handle, reason=reason)
+        self._finish_tweet_trace(tweet_id, reason)
+        self._mark_processed(state, tweet_id)
 
+    # Tracing helpers ---------------------------------------------------
+    def _start_tweet_trace(self, tweet: Tweet, fetch_started: int, fetched_at: int) -> None:
+        """Open the per-tweet root span, starting when the bot began waiting for it."""
+        if tweet.id in self._tweet_spans:
+            return
+        cycle_span = tracing.current_span()
+        root = tracing.start_span(
+            "tweet",
+            trace_id=tracing.trace_id_for(tweet.id),
+            attributes={"bot.handle": self._metric_handle, "tweet.id": tweet.id},
+            start_ns=fetch_started,
+        )
+        fetch_span = tracing.start_span("fetch", parent=root, start_ns=fetch_started)
+        if cycle_span is not None:
+            # The search request itself is recorded once, in the cycle trace.
+            fetch_span.add_link(cycle_span)
+        fetch_span.end(fetched_at)
+        self._tweet_spans[tweet.id] = root
+
+    def _finish_tweet_trace(self, tweet_id: int, outcome: str) -> None:
+        root = self._tweet_spans.pop(tweet_id, None)
+        if root is not None:
+            root.set_attribute("bot.outcome", outcome)
+            root.end()
+
+    async def _iter_pages(self, since_id: Optional[int]) -> AsyncIterator[list[Tweet]]:
+        if self._search is not None:
+            pages = self._search.stream(
+                self.handle,
+                self._twitter,
+                max_results=self._settings.max_tweets_per_run,
+                max_pages=self._settings.max_pages_per_run,
+                page_size=self._settings.search_page_size,
+                since_id=since_id,
+                max_age=self._poll.current,
+            )
+        else:
+            pages = self._twitter.iter_recent_pages(
+                max_tweets=self._settings.max_tweets_per_run,
+                max_pages=self._settings.max_pages_per_run,
+                page_size=self._settings.search_page_size,
+                since_id=since_id,
+            )
+        async for page in pages:
+            yield page
+
+    async def _draft_batch(self, tweets: list[Tweet]) -> dict[int, Draft]:
+        """Classify a batch in one LLM call, then draft replies for accepted tweets."""
+        try:
+            decisions = await self._should_reply_batch(tweets)
+        except Exception as exc:
+            self._log_llm_failure("Classification", tweets, exc)
+            return {tweet.id: exc for tweet in tweets}
+        return await self._draft_all(tweets, decisions)
+
+    async def _draft_fast_tracked(self, tweet: Tweet, note: str) -> dict[int, Draft]:
+        """Draft a reply for a tweet the prefilter accepted without the classifier."""
+        return await self._draft_all([tweet], {tweet.id: (True, note)})
+
+    async def _draft_all(self, tweets: list[Tweet], decisions: dict[int, tuple[bool, str]]) -> dict[int, Draft]:
+        results = await asyncio.gather(
+            *(self._draft_reply(tweet, decisions[tweet.id]) for tweet in tweets), return_exceptions=True
+        )
+        drafts: dict[int, Draft] = {}
+        for tweet, result in zip(tweets, results):
+            if isinstance(result, Exception):
+                self._log_llm_failure("Reply generation", [tweet], result)
+            elif isinstance(result, BaseException):
+                raise result
+            drafts[tweet.id] = result
+        return drafts
+
+    @staticmethod
+    def _log_llm_failure(operation: str, tweets: list[Tweet], exc: Exception) -> None:
+        ids = ", ".join(str(tweet.id) for tweet in tweets)
+        if isinstance(exc, CircuitOpenError):
+            logger.warning("%s deferred for tweets %s: %s", operation, ids, exc)
+        elif is_transient(exc):
+            logger.warning("%s failed for tweets %s (%s); retrying next cycle", operation, ids, exc)
+        else:
+            logger.error("%s failed for tweets %s", operation, ids, exc_info=exc)
+
+    async def _draft_reply(self, tweet: Tweet, decision: tuple[bool, str]) -> Optional[str]:
+        should_reply, classifier_note = decision
+        if not should_reply:
             logger.info(
-                "Generating reply for tweet %s (@%s)",
+                "Skipping tweet %s (@%s) | classifier=%s",
                 tweet.id,
                 tweet.author_handle,
+                classifier_note,
             )
-            reply = self._build_reply(tweet)
-            if not reply:
-                logger.info("No reply generated for tweet %s", tweet.id)
-                processed.add(tweet.id)
-                state.processed_ids.append(tweet.id)
-                continue
-            logger.info("Reply content for tweet %s: %s", tweet.id, reply)
-            if self._dry_run:
-                logger.info("Dry run enabled; not posting reply for tweet %s", tweet.id)
-                processed.add(tweet.id)
-                state.processed_ids.append(tweet.id)
-                continue
-            try:
-                logger.info("Posting reply to tweet %s", tweet.id)
-                self._twitter.post_reply(tweet.id, reply)
-            except Exception:  # pragma: no cover - network interaction
-                logger.exception("Failed to post reply to tweet %s", tweet.id)
-                continue
-            processed.add(tweet.id)
-            state.processed_ids.append(tweet.id)
-            replies_sent += 1
-
-        if highest_seen_id:
-            state.last_seen_id = highest_seen_id
+            return None
 
-        self._storage.save_state(state)
-        return replies_sent
+        logger.info(
+            "Generating reply for tweet %s (@%s)",
+            tweet.id,
+            tweet.author_handle,
+        )
+        with tracing.span("generate", parent=self._tweet_spans.get(tweet.id)):
+            reply = await self._build_reply(tweet)
+        if not reply:
+            logger.info("No reply generated for tweet %s", tweet.id)
+            return None
+        return reply
 
-    def _build_reply(self, tweet: Tweet) -> Optional[str]:
+    async def _build_reply(self, tweet: Tweet) -> Optional[str]:
         if self._reply_generator is None:
             return None
-        try:
-            draft = self._reply_generator.generate(
+        async with self._llm_slots:
+            draft = await self._reply_generator.generate(
                 TweetContext(text=tweet.text, author_handle=tweet.author_handle, url=tweet.url)
             )
-        except Exception:  # pragma: no cover - network interaction
-            logger.exception("Failed to generate reply for tweet %s", tweet.id)
-            return None
-        cleaned = self._sanitize_reply(draft)
+        cleaned = self._sanitize_reply(draft, self._settings.openai.reply_char_limit)
         if not cleaned:
             logger.debug("Generated empty reply for tweet %s", tweet.id)
             return None
         return cleaned
 
-    def _should_reply(self, tweet: Tweet) -> tuple[bool, str]:
+    async def _should_reply_batch(self, tweets: list[Tweet]) -> dict[int, tuple[bool, str]]:
         if self._reply_generator is None:
-            return False, "no_openrouter_key"
-        try:
-            context = TweetContext(text=tweet.text, author_handle=tweet.author_handle, url=tweet.url)
-            return self._reply_generator.should_reply(context)
-        except Exception:  # pragma: no cover - network interaction
-            logger.exception("Failed to classify tweet %s", tweet.id)
-            return False, "classification_exception"
+            return {tweet.id: (False, "no_openrouter_key") for tweet in tweets}
+        contexts = {
+            tweet.id: TweetContext(text=tweet.text, author_handle=tweet.author_handle, url=tweet.url)
+            for tweet in tweets
+        }
+        with tracing.span("classify_batch", attributes={"bot.batch_size": len(tweets)}) as batch_span:
+            async with self._llm_slots:
+                decisions = await self._reply_generator.should_reply_batch(contexts)
+        if tracing.enabled():
+            # One LLM call served the whole batch; mirror it into each tweet's trace.
+            for tweet in tweets:
+                classify_span = tracing.start_span(
+                    "classify",
+                    parent=self._tweet_spans.get(tweet.id),
+                    attributes={"bot.should_reply": decisions.get(tweet.id, (False, ""))[0]},
+                    start_ns=batch_span.start_ns,
+                )
+                classify_span.add_link(batch_span)
+                classify_span.end(batch_span.end_ns)
+        return decisions
+
+    def _log_prompt_cache(self) -> None:
+        persona = self._settings.openai.persona
+        usage = prompt_cache_report(persona) if self._reply_generator is not None and persona else []
+        prompt_tokens = sum(entry.prompt_tokens for entry in usage)
+        if prompt_tokens:
+            cached = sum(entry.cached_tokens for entry in usage)
+            logger.info(
+                "Provider prompt cache for persona %s: %.0f%% of %s prompt tokens cached so far",
+                persona,
+                100.0 * cached / prompt_tokens,
+                prompt_tokens,
+            )
+
+    # Token budget ------------------------------------------------------
+    def _token_budget_left(self, tweet: Tweet) -> Optional[int]:
+        """Tokens left today when the budget rules out ``tweet``, else ``None``.
+
+        Below ``low_budget_share`` of the budget only tweets scoring at least
+        ``priority_score`` are classified; an exhausted budget skips them all.
+        The check runs before classification, so it covers both LLM calls.
+        """
+        budget = self._token_budget
+        if not budget or self._ledger is None:
+            return None
+        left = max(0, budget - self._ledger.tokens_today(self._metric_handle))
+        TOKEN_BUDGET_REMAINING.set(left, handle=self._metric_handle)
+        usage = self._settings.usage
+        if left == 0 or (left < budget * usage.low_budget_share and tweet.popularity_score < usage.priority_score):
+            return left
+        return None
+
+    def _log_token_usage(self) -> None:
+        if self._ledger is None or self._reply_generator is None:
+            return
+        self._ledger.flush()
+        spent = self._ledger.tokens_today(self._metric_handle)
+        if self._token_budget:
+            TOKEN_BUDGET_REMAINING.set(max(0, self._token_budget - spent), handle=self._metric_handle)
+            logger.info("LLM tokens today: %s of %s budget", spent, self._token_budget)
+        else:
+            logger.info("LLM tokens today: %s", spent)
+
+    def _cache_counts(self) -> tuple[int, int]:
+        if self._reply_generator is None:
+            return 0, 0
+        stats = self._reply_generator.cache_stats
+        return stats.hits, stats.misses
 
     @staticmethod
     def _sanitize_reply(text: str, limit: int = 280) -> str:
@@ -0,0 +1,111 @@
+"""On-disk cache for classifier verdicts and reply drafts keyed by tweet content."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+_URL_RE = re.compile(r"https?://\S+")
+_MENTION_RE = re.compile(r"@\w+")
+_RETWEET_PREFIX_RE = re.compile(r"^rt\s+@\w+:\s*")
+_EVICT_EVERY = 100
+
+
+def normalize_tweet_text(text: str) -> str:
+    """Reduce a tweet to the content that drives the LLM answer.
+
+    Retweet prefixes, links, mentions, case and whitespace differences are
+    dropped so copy-paste variants of the same shill text share one entry.
+    """
+    lowered = text.strip().lower()
+    lowered = _RETWEET_PREFIX_RE.sub("", lowered)
+    lowered = _URL_RE.sub("", lowered)
+    lowered = _MENTION_RE.sub("", lowered)
+    return " ".join(lowered.split())
+
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class ResponseCache:
+    """SQLite-backed cache with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path: str, *, ttl_seconds: int = 86400, max_entries: int = 50000) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._puts = 0
+        self._conn = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    @staticmethod
+    def make_key(kind: str, model: str, prompt: str, text: str) -> str:
+        material = "\x1f".join((kind, model, _prompt_hash(prompt), normalize_tweet_text(text)))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, model: str, prompt: str, text: str) -> Optional[dict]:
+        key = self.make_key(kind, model, prompt, text)
+        row = self._conn.execute(
+            "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        value, created_at = row
+        if self._ttl > 0 and created_at + self._ttl < now:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+
+    def put(self, kind: str, model: str, prompt: str, text: str, value: dict) -> None:
+        key = self.make_key(kind, model, prompt, text)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (key, kind, value, created_at, last_used)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(value, ensure_ascii=False), now, now),
+        )
+        self._puts += 1
+        if self._puts % _EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired rows, then the least recently used beyond ``max_entries``."""
+        if self._ttl > 0:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self._ttl,))
+        if self._max_entries > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,19 +1,17 @@
 """Configuration helpers for the auto-reply bot."""
 
 import os
+import re
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
 
-import yaml
-from dotenv import load_dotenv
-
-
-load_dotenv()
 
 CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.yml"
 PROJECT_ROOT = CONFIG_PATH.parent
 VAR_DIR = PROJECT_ROOT / "var"
+TWITTER_API_BASE = "https://api.twitter.com/2"
 
 
 def _normalize_handle(value: str) -> str:
@@ -24,6 +22,12 @@ def token_cache_path(handle: str) -> Path:
     return VAR_DIR / f"token_{_normalize_handle(handle)}.json"
 
 
+def _optional_int(value: object) -> Optional[int]:
+    if value is None or str(value).strip() == "":
+        return None
+    return int(value)
+
+
 def _load_prompt_text(path_value: str, *, label: str) -> str:
     path_str = str(path_value).strip()
     if not path_str:
@@ -39,13 +43,319 @@ def _load_prompt_text(path_value: str, *, label: str) -> str:
 @dataclass(slots=True)
 class DefaultsConfig:
     poll_interval_seconds: int = 300
+    min_poll_interval_seconds: Optional[int] = None
+    max_poll_interval_seconds: Optional[int] = None
     max_tweets_per_run: int = 10
+    max_pages_per_run: int = 1
+    search_page_size: int = 100
+    llm_concurrency: int = 8
+    classifier_batch_size: int = 10
+    dedup_history: int = 5000
+
+
+@dataclass(slots=True)
+class CacheConfig:
+    enabled: bool = True
+    path: str = str(VAR_DIR / "llm_cache.sqlite3")
+    ttl_seconds: int = 86400
+    max_entries: int = 50000
+    cache_replies: bool = False
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "CacheConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 cache 节必须是字典")
+        path_value = str(raw.get("path", "")).strip()
+        path = Path(path_value) if path_value else VAR_DIR / "llm_cache.sqlite3"
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return cls(
+            enabled=bool(raw.get("enabled", True)),
+            path=str(path),
+            ttl_seconds=int(raw.get("ttl_seconds", 86400)),
+            max_entries=int(raw.get("max_entries", 50000)),
+            cache_replies=bool(raw.get("cache_replies", False)),
+        )
+
+
+@dataclass(slots=True)
+class HttpConfig:
+    http2: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry_seconds: float = 60.0
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "HttpConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 http 节必须是字典")
+        return cls(
+            http2=bool(raw.get("http2", True)),
+            max_connections=int(raw.get("max_connections", 100)),
+            max_keepalive_connections=int(raw.get("max_keepalive_connections", 20)),
+            keepalive_expiry_seconds=float(raw.get("keepalive_expiry_seconds", 60.0)),
+        )
+
+
+@dataclass(slots=True)
+class PrefilterConfig:
+    enabled: bool = True
+    blocked_authors: tuple[str, ...] = ()
+    drop_patterns: tuple[str, ...] = ()
+    fast_track_patterns: tuple[str, ...] = ()
+    max_links: Optional[int] = None
+    max_hashtags: Optional[int] = None
+    max_mentions: Optional[int] = None
+    min_words: int = 0
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "PrefilterConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 prefilter 节必须是字典")
+
+        def string_list(key: str) -> tuple[str, ...]:
+            value = raw.get(key)
+            if value is None:
+                return ()
+            if not isinstance(value, (list, tuple)):
+                raise RuntimeError(f"config.yml 的 prefilter.{key} 必须是列表")
+            return tuple(str(item).strip() for item in value if str(item).strip())
+
+        patterns: dict[str, tuple[str, ...]] = {}
+        for key in ("drop_patterns", "fast_track_patterns"):
+            patterns[key] = string_list(key)
+            for pattern in patterns[key]:
+                try:
+                    re.compile(pattern)
+                except re.error as exc:
+                    raise RuntimeError(f"config.yml prefilter.{key} 正则无效: {pattern}") from exc
+
+        return cls(
+            enabled=bool(raw.get("enabled", True)),
+            blocked_authors=tuple(item.lower().lstrip("@") for item in string_list("blocked_authors")),
+            drop_patterns=patterns["drop_patterns"],
+            fast_track_patterns=patterns["fast_track_patterns"],
+            max_links=_optional_int(raw.get("max_links")),
+            max_hashtags=_optional_int(raw.get("max_hashtags")),
+            max_mentions=_optional_int(raw.get("max_mentions")),
+            min_words=int(raw.get("min_words", 0)),
+        )
+
+
+@dataclass(slots=True)
+class NearDuplicateConfig:
+    enabled: bool = True
+    capacity: int = 5000
+    window_seconds: int = 21600
+    max_distance: int = 3
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "NearDuplicateConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 near_duplicates 节必须是字典")
+        max_distance = int(raw.get("max_distance", 3))
+        if not 0 <= max_distance <= 3:
+            raise RuntimeError("config.yml near_duplicates.max_distance 必须在 0 到 3 之间")
+        return cls(
+            enabled=bool(raw.get("enabled", True)),
+            capacity=int(raw.get("capacity", 5000)),
+            window_seconds=int(raw.get("window_seconds", 21600)),
+            max_distance=max_distance,
+        )
+
+
+@dataclass(slots=True)
+class OutboxConfig:
+    max_attempts: int = 8
+    base_delay_seconds: float = 30.0
+    max_delay_seconds: float = 1800.0
+    max_age_seconds: int = 21600
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "OutboxConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 outbox 节必须是字典")
+        max_attempts = int(raw.get("max_attempts", 8))
+        if max_attempts < 1:
+            raise RuntimeError("config.yml outbox.max_attempts 必须大于 0")
+        return cls(
+            max_attempts=max_attempts,
+            base_delay_seconds=float(raw.get("base_delay_seconds", 30.0)),
+            max_delay_seconds=float(raw.get("max_delay_seconds", 1800.0)),
+            max_age_seconds=int(raw.get("max_age_seconds", 21600)),
+        )
+
+
+@dataclass(slots=True)
+class PostingConfig:
+    enabled: bool = True
+    max_replies: int = 30
+    window_seconds: int = 3600
+    reserved_replies: int = 10
+    priority_score: int = 20
+    low_value_action: str = "defer"
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "PostingConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 posting 节必须是字典")
+        max_replies = int(raw.get("max_replies", 30))
+        reserved_replies = int(raw.get("reserved_replies", 10))
+        if max_replies > 0 and not 0 <= reserved_replies < max_replies:
+            raise RuntimeError("config.yml posting.reserved_replies 必须小于 max_replies")
+        low_value_action = str(raw.get("low_value_action", "defer")).strip().lower()
+        if low_value_action not in ("defer", "drop"):
+            raise RuntimeError("config.yml posting.low_value_action 只能是 defer 或 drop")
+        return cls(
+            enabled=bool(raw.get("enabled", True)),
+            max_replies=max_replies,
+            window_seconds=int(raw.get("window_seconds", 3600)),
+            reserved_replies=reserved_replies,
+            priority_score=int(raw.get("priority_score", 20)),
+            low_value_action=low_value_action,
+        )
+
+
+@dataclass(slots=True)
+class ModelPrice:
+    """USD per million tokens."""
+
+    input: float = 0.0
+    output: float = 0.0
+    cached_input: Optional[float] = None
+
+    def cost(self, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+        cached_rate = self.input if self.cached_input is None else self.cached_input
+        uncached = max(0, input_tokens - cached_tokens)
+        return (uncached * self.input + cached_tokens * cached_rate + output_tokens * self.output) / 1_000_000
+
+
+@dataclass(slots=True)
+class UsageConfig:
+    enabled: bool = True
+    path: str = str(VAR_DIR / "usage.sqlite3")
+    hourly_retention_days: int = 14
+    daily_token_budget: int = 0
+    handle_budgets: dict[str, int] = field(default_factory=dict)
+    low_budget_share: float = 0.2
+    priority_score: int = 20
+    prices: dict[str, ModelPrice] = field(default_factory=dict)
+
+    def budget_for(self, handle: str) -> int:
+        """Daily token budget for ``handle``; 0 means unlimited."""
+        if not self.enabled:
+            return 0
+        return self.handle_budgets.get(_normalize_handle(handle), self.daily_token_budget)
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "UsageConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 usage 节必须是字典")
+        path_value = str(raw.get("path", "")).strip()
+        path = Path(path_value) if path_value else VAR_DIR / "usage.sqlite3"
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        budgets_raw = raw.get("handle_budgets") or {}
+        if not isinstance(budgets_raw, dict):
+            raise RuntimeError("config.yml 的 usage.handle_budgets 必须是字典")
+        prices_raw = raw.get("prices") or {}
+        if not isinstance(prices_raw, dict):
+            raise RuntimeError("config.yml 的 usage.prices 必须是字典")
+        prices: dict[str, ModelPrice] = {}
+        for model, price_raw in prices_raw.items():
+            if not isinstance(price_raw, dict):
+                raise RuntimeError(f"config.yml usage.prices.{model} 必须是字典")
+            cached_input = price_raw.get("cached_input")
+            prices[str(model)] = ModelPrice(
+                input=float(price_raw.get("input", 0.0)),
+                output=float(price_raw.get("output", 0.0)),
+                cached_input=float(cached_input) if cached_input is not None else None,
+            )
+        low_budget_share = float(raw.get("low_budget_share", 0.2))
+        if not 0 <= low_budget_share < 1:
+            raise RuntimeError("config.yml usage.low_budget_share 必须在 0 到 1 之间")
+        return cls(
+            enabled=bool(raw.get("enabled", True)),
+            path=str(path),
+            hourly_retention_days=max(1, int(raw.get("hourly_retention_days", 14))),
+            daily_token_budget=max(0, int(raw.get("daily_token_budget", 0))),
+            handle_budgets={
+                _normalize_handle(str(handle)): max(0, int(tokens)) for handle, tokens in budgets_raw.items()
+            },
+            low_budget_share=low_budget_share,
+            priority_score=int(raw.get("priority_score", 20)),
+            prices=prices,
+        )
+
+
+@dataclass(slots=True)
+class LlmConfig:
+    timeout_seconds: float = 30.0
+    model_timeouts: dict[str, float] = field(default_factory=dict)
+    max_retries: int = 2
+    retry_base_delay_seconds: float = 0.5
+    retry_max_delay_seconds: float = 8.0
+    fallback_model: Optional[str] = None
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_failure_rate: float = 0.5
+    breaker_cooldown_seconds: float = 60.0
+
+    def timeout_for(self, model: str) -> float:
+        return self.model_timeouts.get(model, self.timeout_seconds)
+
+    @classmethod
+    def from_dict(cls, raw: object) -> "LlmConfig":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise RuntimeError("config.yml 的 llm 节必须是字典")
+        timeouts_raw = raw.get("model_timeouts") or {}
+        if not isinstance(timeouts_raw, dict):
+            raise RuntimeError("config.yml 的 llm.model_timeouts 必须是字典")
+        breaker_raw = raw.get("circuit_breaker") or {}
+        if not isinstance(breaker_raw, dict):
+            raise RuntimeError("config.yml 的 llm.circuit_breaker 必须是字典")
+        failure_rate = float(breaker_raw.get("failure_rate", 0.5))
+        if not 0 < failure_rate <= 1:
+            raise RuntimeError("config.yml llm.circuit_breaker.failure_rate 必须在 0 到 1 之间")
+        fallback = str(raw.get("fallback_model") or "").strip()
+        return cls(
+            timeout_seconds=float(raw.get("timeout_seconds", 30.0)),
+            model_timeouts={str(model): float(seconds) for model, seconds in timeouts_raw.items()},
+            max_retries=max(0, int(raw.get("max_retries", 2))),
+            retry_base_delay_seconds=float(raw.get("retry_base_delay_seconds", 0.5)),
+            retry_max_delay_seconds=float(raw.get("retry_max_delay_seconds", 8.0)),
+            fallback_model=fallback or None,
+            breaker_window=max(1, int(breaker_raw.get("window", 20))),
+            breaker_min_calls=max(1, int(breaker_raw.get("min_calls", 10))),
+            breaker_failure_rate=failure_rate,
+            breaker_cooldown_seconds=float(breaker_raw.get("cooldown_seconds", 60.0)),
+        )
 
 
 @dataclass(slots=True)
 class ModelsConfig:
     reply_model: str
     classifier_model: str
+    reply_max_output_tokens: int = 512
+    classifier_max_output_tokens: int = 10000
+    stream_replies: bool = True
+    prompt_cache_control: bool = False
 
 
 @dataclass(slots=True)
@@ -71,6 +381,14 @@ class BotsConfig:
     accounts: dict[str, AccountConfig]
     personas: dict[str, PersonaConfig]
     ignore_handles: tuple[str, ...]
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    http: HttpConfig = field(default_factory=HttpConfig)
+    prefilter: PrefilterConfig = field(default_factory=PrefilterConfig)
+    near_duplicates: NearDuplicateConfig = field(default_factory=NearDuplicateConfig)
+    outbox: OutboxConfig = field(default_factory=OutboxConfig)
+    posting: PostingConfig = field(default_factory=PostingConfig)
+    llm: LlmConfig = field(default_factory=LlmConfig)
+    usage: UsageConfig = field(default_factory=UsageConfig)
 
     @classmethod
     def from_dict(cls, raw: dict[str, object]) -> "BotsConfig":
@@ -80,7 +398,14 @@ class BotsConfig:
         elif isinstance(defaults_raw, dict):
             defaults = DefaultsConfig(
                 poll_interval_seconds=int(defaults_raw.get("poll_interval_seconds", 300)),
+                min_poll_interval_seconds=_optional_int(defaults_raw.get("min_poll_interval_seconds")),
+                max_poll_interval_seconds=_optional_int(defaults_raw.get("max_poll_interval_seconds")),
                 max_tweets_per_run=int(defaults_raw.get("max_tweets_per_run", 10)),
+                max_pages_per_run=int(defaults_raw.get("max_pages_per_run", 1)),
+                search_page_size=min(100, max(10, int(defaults_raw.get("search_page_size", 100)))),
+                llm_concurrency=int(defaults_raw.get("llm_concurrency", 8)),
+                classifier_batch_size=int(defaults_raw.get("classifier_batch_size", 10)),
+                dedup_history=int(defaults_raw.get("dedup_history", 5000)),
             )
         else:
             raise RuntimeError("config.yml 的 defaults 节必须是字典")
@@ -94,7 +419,14 @@ class BotsConfig:
             raise RuntimeError("config.yml 缺少 models.reply_model 配置")
         if not classifier_model:
             raise RuntimeError("config.yml 缺少 models.classifier_model 配置")
-        models = ModelsConfig(reply_model=reply_model, classifier_model=classifier_model)
+        models = ModelsConfig(
+            reply_model=reply_model,
+            classifier_model=classifier_model,
+            reply_max_output_tokens=int(models_raw.get("reply_max_output_tokens", 512)),
+            classifier_max_output_tokens=int(models_raw.get("classifier_max_output_tokens", 10000)),
+            stream_replies=bool(models_raw.get("stream_replies", True)),
+            prompt_cache_control=bool(models_raw.get("prompt_cache_control", False)),
+        )
 
         personas_raw = raw.get("personas")
         if not isinstance(personas_raw, dict) or not personas_raw:
@@ -176,12 +508,29 @@ class BotsConfig:
         if not accounts:
             raise RuntimeError("config.yml 中没有配置任何账号")
 
+        cache = CacheConfig.from_dict(raw.get("cache"))
+        http = HttpConfig.from_dict(raw.get("http"))
+        prefilter = PrefilterConfig.from_dict(raw.get("prefilter"))
+        near_duplicates = NearDuplicateConfig.from_dict(raw.get("near_duplicates"))
+        outbox = OutboxConfig.from_dict(raw.get("outbox"))
+        posting = PostingConfig.from_dict(raw.get("posting"))
+        llm = LlmConfig.from_dict(raw.get("llm"))
+        usage = UsageConfig.from_dict(raw.get("usage"))
+
         return cls(
             defaults=defaults,
             models=models,
             accounts=accounts,
             personas=personas,
             ignore_handles=ignore_handles,
+            cache=cache,
+            http=http,
+            prefilter=prefilter,
+            near_duplicates=near_duplicates,
+            outbox=outbox,
+            posting=posting,
+            llm=llm,
+            usage=usage,
         )
 
     def select_account(self, handle_hint: Optional[str]) -> AccountConfig:
@@ -197,6 +546,8 @@ class BotsConfig:
 
 
 def load_bots_config(path: Path) -> Optional[BotsConfig]:
+    import yaml
+
     if not path.exists():
         return None
     try:
@@ -210,7 +561,26 @@ def load_bots_config(path: Path) -> Optional[BotsConfig]:
     return BotsConfig.from_dict(raw)
 
 
-BOTS_CONFIG = load_bots_config(CONFIG_PATH)
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """Read ``.env`` into the environment once; existing variables win."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def get_bots_config() -> Optional[BotsConfig]:
+    """Parse config.yml and the persona prompts on first use, then reuse the result."""
+    load_env()
+    return load_bots_config(CONFIG_PATH)
+
+
+def __getattr__(name: str) -> object:
+    # BOTS_CONFIG used to be built at import time; keep it importable for scripts.
+    if name == "BOTS_CONFIG":
+        return get_bots_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @dataclass(slots=True)
@@ -221,12 +591,19 @@ class OpenAISettings:
     classification_prompt: str
     provider: str = "openrouter"
     api_key: Optional[str] = field(default=None, repr=False)
+    reply_max_output_tokens: int = 512
+    classifier_max_output_tokens: int = 10000
+    stream_replies: bool = True
+    reply_char_limit: int = 280
+    persona: str = ""
+    prompt_cache_control: bool = False
 
 
 def _select_account(handle_hint: Optional[str]) -> AccountConfig:
-    if BOTS_CONFIG is None:
+    config = get_bots_config()
+    if config is None:
         raise RuntimeError(f"缺少配置文件: {CONFIG_PATH}")
-    return BOTS_CONFIG.select_account(handle_hint)
+    return config.select_account(handle_hint)
 
 
 @dataclass(slots=True)
@@ -240,6 +617,7 @@ class TwitterSettings:
     handle: str
     persona: str
     bot_usernames: Tuple[str, ...] = ()
+    api_base: str = TWITTER_API_BASE
 
 
 @dataclass(slots=True)
@@ -248,8 +626,24 @@ class AppSettings:
     openai: OpenAISettings
     state_path: str
     token_store_path: str
+    outbox_path: str
     poll_interval_seconds: int = 300
+    min_poll_interval_seconds: int = 300
+    max_poll_interval_seconds: int = 300
     max_tweets_per_run: int = 10
+    max_pages_per_run: int = 1
+    search_page_size: int = 100
+    llm_concurrency: int = 8
+    classifier_batch_size: int = 10
+    dedup_history: int = 5000
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    http: HttpConfig = field(default_factory=HttpConfig)
+    prefilter: PrefilterConfig = field(default_factory=PrefilterConfig)
+    near_duplicates: NearDuplicateConfig = field(default_factory=NearDuplicateConfig)
+    outbox: OutboxConfig = field(default_factory=OutboxConfig)
+    posting: PostingConfig = field(default_factory=PostingConfig)
+    llm: LlmConfig = field(default_factory=LlmConfig)
+    usage: UsageConfig = field(default_factory=UsageConfig)
 
     @classmethod
     def from_env(cls, *, handle: Optional[str] = None) -> "AppSettings":
@@ -259,9 +653,10 @@ class AppSettings:
                 raise RuntimeError(f"Missing required environment variable: {name}")
             return value
 
+        load_env()
         account_hint = handle or os.getenv("TWITTER_HANDLE")
         account = _select_account(account_hint)
-        config = BOTS_CONFIG
+        config = get_bots_config()
         if config is None:
             raise RuntimeError(f"缺少配置文件: {CONFIG_PATH}")
         persona_config = config.personas.get(account.persona)
@@ -278,11 +673,13 @@ class AppSettings:
             handle=account.handle,
             persona=account.persona,
             bot_usernames=config.ignore_handles,
+            api_base=os.getenv("TWITTER_API_BASE", TWITTER_API_BASE).rstrip("/"),
         )
 
         token_path = token_cache_path(account.handle)
         normalized_handle = account.handle.lower().lstrip("@")
-        state_path = VAR_DIR / f"state_{normalized_handle}.json"
+        state_path = VAR_DIR / f"state_{normalized_handle}.sqlite3"
+        outbox_path = VAR_DIR / f"outbox_{normalized_handle}.sqlite3"
 
         provider = os.getenv("LLM_PROVIDER", "openrouter").strip().lower()
         if provider != "openrouter":
@@ -297,19 +694,52 @@ class AppSettings:
             classification_prompt=persona_config.classifier_prompt,
             provider=provider,
             api_key=api_key_value.strip() if api_key_value else None,
+            reply_max_output_tokens=config.models.reply_max_output_tokens,
+            classifier_max_output_tokens=config.models.classifier_max_output_tokens,
+            stream_replies=config.models.stream_replies,
+            persona=account.persona,
+            prompt_cache_control=config.models.prompt_cache_control,
         )
 
         poll_interval_default = config.defaults.poll_interval_seconds
         max_tweets_default = config.defaults.max_tweets_per_run
 
         poll_interval = int(os.getenv("POLL_INTERVAL_SECONDS", poll_interval_default))
+        # Without explicit bounds the interval stays fixed at poll_interval.
+        min_poll_interval = int(
+            os.getenv("MIN_POLL_INTERVAL_SECONDS", config.defaults.min_poll_interval_seconds or poll_interval)
+        )
+        max_poll_interval = int(
+            os.getenv("MAX_POLL_INTERVAL_SECONDS", config.defaults.max_poll_interval_seconds or poll_interval)
+        )
         max_tweets = int(os.getenv("MAX_TWEETS_PER_RUN", max_tweets_default))
+        max_pages = int(os.getenv("MAX_PAGES_PER_RUN", config.defaults.max_pages_per_run))
+        llm_concurrency = int(os.getenv("LLM_CONCURRENCY", config.defaults.llm_concurrency))
+        classifier_batch_size = int(
+            os.getenv("CLASSIFIER_BATCH_SIZE", config.defaults.classifier_batch_size)
+        )
 
         return cls(
             twitter=twitter,
             openai=openai_settings,
             poll_interval_seconds=poll_interval,
+            min_poll_interval_seconds=min_poll_interval,
+            max_poll_interval_seconds=max_poll_interval,
             max_tweets_per_run=max_tweets,
+            max_pages_per_run=max_pages,
+            search_page_size=config.defaults.search_page_size,
+            llm_concurrency=llm_concurrency,
+            classifier_batch_size=classifier_batch_size,
+            dedup_history=config.defaults.dedup_history,
+            cache=config.cache,
+            http=config.http,
+            prefilter=config.prefilter,
+            near_duplicates=config.near_duplicates,
+            outbox=config.outbox,
+            posting=config.posting,
+            llm=config.llm,
+            usage=config.usage,
             state_path=str(state_path),
             token_store_path=str(token_path),
+            outbox_path=str(outbox_path),
         )
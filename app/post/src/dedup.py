@@ -0,0 +1,152 @@
+"""SimHash-based near-duplicate detection for incoming tweets."""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .cache import normalize_tweet_text
+from .twitter_service import Tweet
+
+
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_SHINGLE = 4
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def simhash(text: str) -> int:
+    """Return a 64-bit SimHash over character 4-grams of the normalized text.
+
+    Character shingles keep tweet-length texts stable under small edits such
+    as punctuation, emoji or a changed word. Empty texts hash to ``0``.
+    """
+    normalized = " ".join(_PUNCTUATION_RE.sub(" ", normalize_tweet_text(text)).split())
+    if len(normalized) > _SHINGLE:
+        features = {normalized[i : i + _SHINGLE] for i in range(len(normalized) - _SHINGLE + 1)}
+    else:
+        features = {normalized} if normalized else set()
+    if not features:
+        return 0
+    weights = [0] * 64
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    signature = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            signature |= 1 << bit
+    return signature
+
+
+class NearDuplicateIndex:
+    """Fixed-size, time-windowed index of tweet signatures.
+
+    Signatures are split into four 16-bit bands; with ``max_distance`` below
+    four, any two signatures within that Hamming distance share at least one
+    band, so lookups only compare against band collisions instead of the
+    whole index. The oldest entries are evicted once ``capacity`` is reached
+    or they fall out of ``window_seconds``.
+    """
+
+    def __init__(self, *, capacity: int = 5000, window_seconds: float = 21600.0, max_distance: int = 3) -> None:
+        self._capacity = max(1, capacity)
+        self._window = window_seconds
+        self._max_distance = min(max_distance, _BANDS - 1)
+        self._entries: OrderedDict[int, tuple[int, float]] = OrderedDict()
+        self._bands: dict[tuple[int, int], set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def match(self, signature: int, *, exclude: Optional[int] = None) -> Optional[int]:
+        """Return the id of the closest indexed tweet within ``max_distance``, if any.
+
+        ``exclude`` skips the tweet's own entry, left behind when an earlier
+        cycle indexed it but failed before the tweet was handled.
+        """
+        self._expire()
+        best: Optional[tuple[int, int]] = None
+        seen: set[int] = set()
+        for key in self._band_keys(signature):
+            for tweet_id in self._bands.get(key, ()):
+                if tweet_id in seen or tweet_id == exclude:
+                    continue
+                seen.add(tweet_id)
+                distance = (self._entries[tweet_id][0] ^ signature).bit_count()
+                if distance <= self._max_distance and (best is None or distance < best[0]):
+                    best = (distance, tweet_id)
+        return best[1] if best else None
+
+    def add(self, tweet_id: int, signature: int) -> None:
+        if tweet_id in self._entries:
+            return
+        while len(self._entries) >= self._capacity:
+            self._evict_oldest()
+        self._entries[tweet_id] = (signature, time.monotonic())
+        for key in self._band_keys(signature):
+            self._bands.setdefault(key, set()).add(tweet_id)
+
+    def _expire(self) -> None:
+        if self._window <= 0:
+            return
+        cutoff = time.monotonic() - self._window
+        while self._entries:
+            _, (_, added_at) = next(iter(self._entries.items()))
+            if added_at >= cutoff:
+                return
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        tweet_id, (signature, _) = self._entries.popitem(last=False)
+        for key in self._band_keys(signature):
+            members = self._bands.get(key)
+            if members is None:
+                continue
+            members.discard(tweet_id)
+            if not members:
+                del self._bands[key]
+
+    @staticmethod
+    def _band_keys(signature: int) -> list[tuple[int, int]]:
+        return [(band, signature >> (band * _BAND_BITS) & _BAND_MASK) for band in range(_BANDS)]
+
+
+class CycleClusters:
+    """Collapse near-duplicate tweets of one polling cycle onto their most popular member.
+
+    Tweets matching an entry from an earlier cycle are duplicates outright.
+    Within the cycle, a member only displaces the current leader when it has
+    a higher ``popularity_score``; displaced leaders end up in ``superseded``.
+    """
+
+    def __init__(self, index: NearDuplicateIndex) -> None:
+        self._index = index
+        self._root_of: dict[int, int] = {}
+        self._leaders: dict[int, Tweet] = {}
+        self.superseded: set[int] = set()
+
+    def admit(self, tweet: Tweet) -> Optional[int]:
+        """Return the id ``tweet`` duplicates, or ``None`` if it should be drafted."""
+        signature = simhash(tweet.text)
+        if not signature:
+            return None
+        match = self._index.match(signature, exclude=tweet.id)
+        self._index.add(tweet.id, signature)
+        if match is None:
+            self._root_of[tweet.id] = tweet.id
+            self._leaders[tweet.id] = tweet
+            return None
+        root = self._root_of.get(match)
+        if root is None:
+            return match
+        self._root_of[tweet.id] = root
+        leader = self._leaders[root]
+        if (tweet.popularity_score, tweet.id) <= (leader.popularity_score, leader.id):
+            return leader.id
+        self._leaders[root] = tweet
+        self.superseded.add(leader.id)
+        return None
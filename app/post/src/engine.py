@@ -0,0 +1,170 @@
+"""Asyncio engine that runs every configured bot as a task on one event loop."""
+
+import asyncio
+import logging
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from . import tracing
+from .bot import AutoReplyBot
+from .cache import ResponseCache
+from .config import AppSettings, HttpConfig
+from .metrics import MetricsServer
+from .openai_service import OPENROUTER_BASE_URL, prompt_cache_report
+from .rate_limit import RateLimiter
+from .resilience import ModelGuard
+from .search import SearchCoordinator
+from .transport import HttpPool, PoolMetrics
+from .usage import UsageLedger
+
+
+logger = logging.getLogger(__name__)
+
+
+class BotEngine:
+    """Own the shared HTTP/LLM clients and drive all bots concurrently."""
+
+    def __init__(
+        self,
+        *,
+        dry_run: bool = False,
+        http_config: Optional[HttpConfig] = None,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = "127.0.0.1",
+        trace_file: Optional[str] = None,
+        stop_on_crash: bool = False,
+    ) -> None:
+        self._dry_run = dry_run
+        self._stop_on_crash = stop_on_crash
+        self.crashed: list[str] = []
+        self._trace_file = trace_file
+        self._pool = HttpPool(http_config)
+        self._http = self._pool.client
+        self._llm_clients: dict[str, AsyncOpenAI] = {}
+        self._caches: dict[str, ResponseCache] = {}
+        self._guard: Optional[ModelGuard] = None
+        self._ledgers: dict[str, UsageLedger] = {}
+        self._search = SearchCoordinator()
+        self._rate_limiter = RateLimiter()
+        self._bots: list[AutoReplyBot] = []
+        self._stop_event = asyncio.Event()
+        self._metrics_server = (
+            MetricsServer(metrics_port, host=metrics_host) if metrics_port is not None else None
+        )
+
+    @property
+    def pool_metrics(self) -> PoolMetrics:
+        return self._pool.metrics
+
+    @property
+    def bots(self) -> tuple[AutoReplyBot, ...]:
+        return tuple(self._bots)
+
+    def add_bot(self, settings: AppSettings) -> AutoReplyBot:
+        bot = AutoReplyBot(
+            settings,
+            dry_run=self._dry_run,
+            http=self._http,
+            llm_client=self._llm_client(settings.openai.api_key),
+            cache=self._cache(settings),
+            search=self._search,
+            rate_limiter=self._rate_limiter,
+            guard=self._model_guard(settings),
+            ledger=self._ledger(settings),
+        )
+        self._bots.append(bot)
+        return bot
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    async def run(self) -> None:
+        if not self._bots:
+            raise RuntimeError("BotEngine 未注册任何账号")
+        if self._trace_file:
+            tracing.configure(self._trace_file)
+        if self._metrics_server is not None:
+            await self._metrics_server.start()
+        tasks = [
+            asyncio.create_task(self._run_bot(bot), name=f"bot-{bot.handle.lower()}")
+            for bot in self._bots
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self._stop_event.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._metrics_server is not None:
+            await self._metrics_server.aclose()
+        await self._search.aclose()
+        for bot in self._bots:
+            await bot.aclose()
+        await self._pool.aclose()
+        for cache in self._caches.values():
+            cache.close()
+        for ledger in self._ledgers.values():
+            ledger.close()
+        for usage in prompt_cache_report():
+            logger.info(
+                "Prompt cache %s/%s: %.0f%% of %s prompt tokens cached",
+                usage.persona,
+                usage.operation,
+                usage.hit_rate * 100,
+                usage.prompt_tokens,
+            )
+        if self._trace_file:
+            tracing.shutdown()
+
+    async def _run_bot(self, bot: AutoReplyBot) -> None:
+        try:
+            await bot.run(stop_event=self._stop_event)
+        except Exception:  # pragma: no cover - network interaction / task
+            logger.exception("Bot task for handle %s crashed", bot.handle)
+            self.crashed.append(bot.handle)
+            if self._stop_on_crash:
+                self.stop()
+
+    def _llm_client(self, api_key: Optional[str]) -> Optional[AsyncOpenAI]:
+        if not api_key:
+            return None
+        client = self._llm_clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key, base_url=OPENROUTER_BASE_URL, http_client=self._http, max_retries=0
+            )
+            self._llm_clients[api_key] = client
+        return client
+
+    def _model_guard(self, settings: AppSettings) -> ModelGuard:
+        # The llm section is global, so the first account's copy serves them all.
+        if self._guard is None:
+            self._guard = ModelGuard(settings.llm)
+        return self._guard
+
+    def _ledger(self, settings: AppSettings) -> Optional[UsageLedger]:
+        if not settings.usage.enabled:
+            return None
+        ledger = self._ledgers.get(settings.usage.path)
+        if ledger is None:
+            ledger = UsageLedger(settings.usage.path, hourly_retention_days=settings.usage.hourly_retention_days)
+            self._ledgers[settings.usage.path] = ledger
+        return ledger
+
+    def _cache(self, settings: AppSettings) -> Optional[ResponseCache]:
+        if not settings.cache.enabled:
+            return None
+        cache = self._caches.get(settings.cache.path)
+        if cache is None:
+            cache = ResponseCache(
+                settings.cache.path,
+                ttl_seconds=settings.cache.ttl_seconds,
+                max_entries=settings.cache.max_entries,
+            )
+            self._caches[settings.cache.path] = cache
+        return cache
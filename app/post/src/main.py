@@ -1,5 +1,6 @@
 """Command-line entry point for the Twitter auto-reply bot."""
 
+import asyncio
 import base64
 import hashlib
 import json
@@ -7,36 +8,39 @@ import logging
 import os
 import secrets
 import sys
-import threading
 import time
 import urllib.parse
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import httpx
 import typer
 
-from .bot import AutoReplyBot
-from .config import AppSettings, BOTS_CONFIG, token_cache_path
+# The bot runtime (openai, httpx, engine) is imported inside the commands that
+# need it, so ``auth`` helpers and ``--help`` start without paying for it.
+from .config import AppSettings, get_bots_config, load_env, token_cache_path
 from .storage import OAuth2Token, Storage
 
+if TYPE_CHECKING:
+    from .supervisor import WorkerOptions
+
 
 AUTH_URL = "https://twitter.com/i/oauth2/authorize"
 TOKEN_URL = "https://api.twitter.com/2/oauth2/token"
 DEFAULT_SCOPES = ("tweet.read", "tweet.write", "users.read", "offline.access")
 _DEFAULT_TIMEOUT = 20.0
 _VAR_DIR = Path(__file__).resolve().parent.parent / "var"
-_STATE_PATH_DEFAULT = str(_VAR_DIR / "state.json")
+_STATE_PATH_DEFAULT = str(_VAR_DIR / "state.sqlite3")
 
 app = typer.Typer(add_completion=False)
 auth_app = typer.Typer(add_completion=False, help="Twitter OAuth 2.0 helper commands.")
 
 
-def configure_logging(level: str) -> None:
+def configure_logging(level: str, *, show_process: bool = False) -> None:
+    process = "%(processName)s | " if show_process else ""
     logging.basicConfig(
         level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        format=f"%(asctime)s | %(levelname)s | {process}%(name)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
         stream=sys.stdout,
     )
@@ -51,16 +55,32 @@ def run(
         help="Generate and log replies without posting to Twitter.",
     ),
     handle: Optional[str] = typer.Option(None, help="Override config.yml account handle for this run."),
+    metrics_port: Optional[int] = typer.Option(
+        None,
+        help="Serve Prometheus metrics on this local port (GET /metrics).",
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None,
+        help="Append OpenTelemetry-style spans as JSON lines to this file.",
+    ),
 ) -> None:
     """Start the auto-reply bot in continuous polling mode."""
+    from .engine import BotEngine
+
     configure_logging(log_level)
     handle_value = handle.lstrip("@") if handle else None
     settings = AppSettings.from_env(handle=handle_value)
-    bot = AutoReplyBot(settings, dry_run=dry_run)
+    engine = BotEngine(
+        dry_run=dry_run,
+        http_config=settings.http,
+        metrics_port=metrics_port,
+        trace_file=str(trace_file) if trace_file else None,
+    )
+    engine.add_bot(settings)
 
     typer.echo("Starting auto-reply bot. Press Ctrl+C to stop.")
     try:
-        bot.run()
+        asyncio.run(engine.run())
     except KeyboardInterrupt:
         typer.echo("\nStopping bot.")
 
@@ -69,13 +89,6 @@ def _normalize_handle(value: str) -> str:
     return value.strip().lstrip("@")
 
 
-def _run_bot_worker(handle: str, bot: AutoReplyBot, stop_event: threading.Event) -> None:
-    try:
-        bot.run(stop_event=stop_event)
-    except Exception:  # pragma: no cover - network interaction / thread
-        logging.getLogger(__name__).exception("Bot thread for handle %s crashed", handle)
-
-
 @app.command("run-all")
 def run_all(
     log_level: str = typer.Option("INFO", help="Logging level (DEBUG, INFO, WARNING)."),
@@ -88,10 +101,24 @@ def run_all(
         "--handle",
         help="Limit to the specified handles (can be provided multiple times).",
     ),
+    metrics_port: Optional[int] = typer.Option(
+        None,
+        help="Serve Prometheus metrics on this local port (GET /metrics).",
+    ),
+    trace_file: Optional[Path] = typer.Option(
+        None,
+        help="Append OpenTelemetry-style spans as JSON lines to this file.",
+    ),
+    workers: int = typer.Option(
+        1,
+        min=1,
+        help="Shard accounts across this many supervised worker processes (1 = single process).",
+    ),
 ) -> None:
     """Start auto-reply bots for multiple accounts concurrently."""
-    configure_logging(log_level)
-    if BOTS_CONFIG is None:
+    configure_logging(log_level, show_process=workers > 1)
+    config = get_bots_config()
+    if config is None:
         raise RuntimeError("缺少 config.yml，无法加载账号配置")
 
     if handle:
@@ -101,52 +128,235 @@ def run_all(
             if not normalized:
                 raise typer.BadParameter(f"无效的 handle 值: {item!r}")
             try:
-                account = BOTS_CONFIG.accounts[normalized.lower()]
+                account = config.accounts[normalized.lower()]
             except KeyError as exc:
                 raise typer.BadParameter(f"config.yml 未找到 handle={item} 的账号配置") from exc
             handles_normalized.append(account.handle)
     else:
-        handles_normalized = [account.handle for account in BOTS_CONFIG.accounts.values()]
+        handles_normalized = [account.handle for account in config.accounts.values()]
 
     if not handles_normalized:
         raise RuntimeError("config.yml 中没有配置任何账号")
 
-    stop_events: list[threading.Event] = []
-    threads: list[threading.Thread] = []
+    if workers > 1:
+        from .supervisor import WorkerOptions
+
+        _run_supervised(
+            [_normalize_handle(account_handle) for account_handle in handles_normalized],
+            workers=workers,
+            options=WorkerOptions(
+                dry_run=dry_run,
+                log_level=log_level,
+                trace_file=str(trace_file) if trace_file else None,
+            ),
+            metrics_port=metrics_port,
+        )
+        return
+
+    from .engine import BotEngine
 
+    engine = BotEngine(
+        dry_run=dry_run,
+        http_config=config.http,
+        metrics_port=metrics_port,
+        trace_file=str(trace_file) if trace_file else None,
+    )
     for account_handle in handles_normalized:
-        stop_event = threading.Event()
         handle_key = _normalize_handle(account_handle)
         settings = AppSettings.from_env(handle=handle_key)
-        bot = AutoReplyBot(settings, dry_run=dry_run)
-        thread = threading.Thread(
-            target=_run_bot_worker,
-            name=f"bot-{handle_key}",
-            args=(account_handle, bot, stop_event),
-            daemon=True,
-        )
-        stop_events.append(stop_event)
-        threads.append(thread)
-        thread.start()
+        engine.add_bot(settings)
         typer.echo(f"Started bot for @{handle_key}")
 
     typer.echo("All bots running. Press Ctrl+C to stop.")
     try:
-        while True:
-            if not any(thread.is_alive() for thread in threads):
-                typer.echo("All bot threads have exited.")
-                break
-            time.sleep(1)
+        asyncio.run(engine.run())
+        typer.echo("All bot tasks have exited.")
     except KeyboardInterrupt:
         typer.echo("\nStop signal received. Shutting down bots...")
-    finally:
-        for event in stop_events:
-            event.set()
-        for thread in threads:
-            thread.join()
     typer.echo("All bots stopped.")
 
 
+def _run_supervised(
+    handles: list[str],
+    *,
+    workers: int,
+    options: "WorkerOptions",
+    metrics_port: Optional[int],
+) -> None:
+    from .supervisor import Supervisor
+
+    # Fail fast on configuration errors instead of crash-looping workers.
+    for handle_key in handles:
+        AppSettings.from_env(handle=handle_key)
+    supervisor = Supervisor(handles, workers=workers, options=options, metrics_port=metrics_port)
+    for index, shard in enumerate(supervisor.shards):
+        typer.echo(f"Worker {index}: " + ", ".join(f"@{handle_key}" for handle_key in shard))
+
+    typer.echo("All workers starting. Press Ctrl+C to stop.")
+    try:
+        supervisor.run()
+        typer.echo("All workers have exited.")
+    except KeyboardInterrupt:
+        typer.echo("\nStop signal received.")
+    typer.echo("All bots stopped.")
+
+
+@app.command()
+def bench(
+    recording: Optional[Path] = typer.Option(
+        None,
+        exists=True,
+        dir_okay=False,
+        help="Recorded search pages and LLM answers (JSON); synthetic traffic when omitted.",
+    ),
+    cycles: int = typer.Option(10, min=1, help="Number of polling cycles to replay."),
+    twitter_latency_ms: float = typer.Option(0.0, help="Added latency per Twitter stand-in request."),
+    llm_latency_ms: float = typer.Option(0.0, help="Added latency per OpenRouter stand-in request."),
+    jitter_ms: float = typer.Option(0.0, help="Uniform +/- jitter applied to both latencies."),
+    twitter_error_rate: float = typer.Option(
+        0.0, min=0.0, max=1.0, help="Share of Twitter requests failing with 503/429."
+    ),
+    llm_error_rate: float = typer.Option(0.0, min=0.0, max=1.0, help="Share of LLM requests failing with 503."),
+    llm_token_ms: float = typer.Option(0.0, help="Delay between streamed reply chunks."),
+    cache: Optional[bool] = typer.Option(None, "--cache/--no-cache", help="Override config.yml cache.enabled."),
+    seed: int = typer.Option(0, help="Seed for synthetic traffic, jitter and error injection."),
+    log_level: str = typer.Option("WARNING", help="Logging level (DEBUG, INFO, WARNING)."),
+) -> None:
+    """Replay traffic through local stand-in APIs and report throughput and latency."""
+    from .bench import FaultConfig, Recording, run_benchmark
+    from .config import DefaultsConfig
+
+    configure_logging(log_level)
+    if recording is not None:
+        replay = Recording.load(recording)
+    else:
+        config = get_bots_config()
+        defaults = config.defaults if config is not None else DefaultsConfig()
+        replay = Recording.synthetic(
+            cycles * max(1, defaults.max_pages_per_run),
+            defaults.search_page_size,
+            seed=seed,
+        )
+    report = run_benchmark(
+        replay,
+        cycles=cycles,
+        twitter_faults=FaultConfig(twitter_latency_ms, jitter_ms, twitter_error_rate),
+        llm_faults=FaultConfig(llm_latency_ms, jitter_ms, llm_error_rate),
+        llm_chunk_delay=llm_token_ms / 1000.0,
+        cache_enabled=cache,
+        seed=seed,
+    )
+
+    p50, p99 = report.percentile(0.50), report.percentile(0.99)
+    typer.echo(f"Cycles:            {report.cycles} ({report.failed_cycles} failed)")
+    typer.echo(f"Tweets processed:  {report.tweets} ({report.replies} replies)")
+    typer.echo(f"Elapsed:           {report.elapsed:.2f} s")
+    typer.echo(f"Throughput:        {report.tweets_per_second:.1f} tweets/s")
+    if p50 is not None and p99 is not None:
+        typer.echo(f"Per-tweet latency: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    typer.echo(
+        f"Stand-in requests: twitter {report.twitter_requests}, llm {report.llm_requests}"
+        f" ({report.injected_errors} injected errors)"
+    )
+    for usage in report.prompt_cache:
+        typer.echo(
+            f"Prompt cache:      {usage.persona}/{usage.operation} {usage.hit_rate * 100:.0f}%"
+            f" of {usage.prompt_tokens} prompt tokens cached"
+        )
+    if report.peak_rss_bytes is not None:
+        typer.echo(f"Peak RSS:          {report.peak_rss_bytes / (1024 * 1024):.1f} MiB")
+
+
+@app.command("bench-startup")
+def bench_startup(
+    runs: int = typer.Option(10, min=1, help="Number of fresh interpreter runs."),
+    command: str = typer.Option("auth link --help", help="CLI arguments to time."),
+    max_ms: Optional[float] = typer.Option(
+        None, help="Fail when the median wall time exceeds this many milliseconds."
+    ),
+    allow_heavy_imports: bool = typer.Option(
+        False, help="Do not fail when openai/httpx/yaml/dotenv get imported."
+    ),
+) -> None:
+    """Time CLI cold start and check that the bot runtime is not imported eagerly."""
+    from .startup import measure_startup
+
+    report = measure_startup(runs, tuple(command.split()))
+    typer.echo(f"Command:           src.main {' '.join(report.args)}")
+    typer.echo(f"Runs:              {len(report.wall_times)}")
+    typer.echo(
+        f"Wall time:         median {report.median_wall * 1000:.1f} ms,"
+        f" min {min(report.wall_times) * 1000:.1f} ms"
+    )
+    typer.echo(f"Import time:       median {report.median_import * 1000:.1f} ms")
+    typer.echo(f"Heavy imports:     {', '.join(report.heavy_modules) or 'none'}")
+
+    failed = False
+    if max_ms is not None and report.median_wall * 1000 > max_ms:
+        typer.echo(f"FAIL: median wall time above {max_ms:.0f} ms", err=True)
+        failed = True
+    if report.heavy_modules and not allow_heavy_imports:
+        typer.echo("FAIL: heavy runtime packages imported during startup", err=True)
+        failed = True
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def usage(
+    days: int = typer.Option(7, min=1, help="Report the last N days (UTC), including today."),
+    hourly: bool = typer.Option(False, "--hourly", help="Show hourly rows instead of daily ones."),
+    handle: Optional[str] = typer.Option(None, help="Only report this account."),
+) -> None:
+    """Report LLM token usage and estimated cost per account, model and call type."""
+    from .config import UsageConfig
+    from .usage import DAY, UsageLedger
+
+    config = get_bots_config()
+    settings = config.usage if config is not None else UsageConfig()
+    if not Path(settings.path).exists():
+        typer.echo(f"No usage recorded yet ({settings.path}).")
+        return
+    ledger = UsageLedger(settings.path, hourly_retention_days=settings.hourly_retention_days)
+    handle_key = _normalize_handle(handle).lower() if handle else None
+    now = time.time()
+    since = (int(now) // DAY - (days - 1)) * DAY
+    try:
+        rows = ledger.rollup("hour" if hourly else "day", since=since, handle=handle_key)
+        period_format = "%Y-%m-%d %H:00" if hourly else "%Y-%m-%d"
+        typer.echo(
+            f"{'Period':<17} {'Handle':<18} {'Model':<28} {'Operation':<15}"
+            f" {'Calls':>7} {'Input':>11} {'Cached':>11} {'Output':>10} {'Cost USD':>10}"
+        )
+        calls = input_tokens = cached_tokens = output_tokens = 0
+        cost = 0.0
+        for row in rows:
+            price = settings.prices.get(row.model)
+            row_cost = price.cost(row.input_tokens, row.cached_tokens, row.output_tokens) if price else None
+            typer.echo(
+                f"{time.strftime(period_format, time.gmtime(row.period)):<17} {'@' + row.handle:<18}"
+                f" {row.model:<28} {row.operation:<15} {row.calls:>7} {row.input_tokens:>11}"
+                f" {row.cached_tokens:>11} {row.output_tokens:>10}"
+                f" {'-' if row_cost is None else f'{row_cost:.4f}':>10}"
+            )
+            calls += row.calls
+            input_tokens += row.input_tokens
+            cached_tokens += row.cached_tokens
+            output_tokens += row.output_tokens
+            cost += row_cost or 0.0
+        typer.echo(
+            f"Total: {calls} calls, {input_tokens} input tokens ({cached_tokens} cached),"
+            f" {output_tokens} output tokens, ~${cost:.4f}"
+        )
+        for name in sorted({row.handle for row in rows}):
+            budget = settings.budget_for(name)
+            spent = ledger.tokens_today(name, now)
+            limit = f" of {budget} budget" if budget else " (no budget)"
+            typer.echo(f"Today @{name}: {spent} tokens{limit}")
+    finally:
+        ledger.close()
+
+
 # ---------------------------------------------------------------------------
 # OAuth helper commands
 # ---------------------------------------------------------------------------
@@ -206,6 +416,10 @@ def exchange_authorization_code(
     token_url: str = TOKEN_URL,
     timeout: float = _DEFAULT_TIMEOUT,
 ) -> dict[str, str]:
+    import httpx
+
+    from .transport import shared_sync_client
+
     auth_header = base64.b64encode(f"{client_id}:{client_secret}".encode("utf-8")).decode("ascii")
     data = {
         "grant_type": "authorization_code",
@@ -218,8 +432,13 @@ def exchange_authorization_code(
         "Authorization": f"Basic {auth_header}",
         "Content-Type": "application/x-www-form-urlencoded",
     }
-    with httpx.Client(timeout=httpx.Timeout(timeout, read=timeout)) as client:
-        response = client.post(token_url, data=data, headers=headers)
+    client = shared_sync_client()
+    response = client.post(
+        token_url,
+        data=data,
+        headers=headers,
+        timeout=httpx.Timeout(timeout, read=timeout),
+    )
     try:
         response.raise_for_status()
     except httpx.HTTPStatusError as exc:
@@ -235,12 +454,14 @@ def _resolve_handle(handle: Optional[str]) -> str:
     env_handle = os.getenv("TWITTER_HANDLE")
     if env_handle:
         return env_handle.lstrip("@").strip()
-    if BOTS_CONFIG is None:
+    config = get_bots_config()
+    if config is None:
         raise RuntimeError("缺少 config.yml，无法确定默认 handle")
-    return BOTS_CONFIG.select_account(None).handle
+    return config.select_account(None).handle
 
 
 def _load_auth_settings(require_secret: bool, *, handle: Optional[str]) -> AuthSettings:
+    load_env()
     client_id = os.getenv("TWITTER_CLIENT_ID")
     client_secret = os.getenv("TWITTER_CLIENT_SECRET")
     redirect_uri = os.getenv("TWITTER_REDIRECT_URI")
@@ -0,0 +1,334 @@
+"""In-process counters and histograms exposed in the Prometheus text format."""
+
+import asyncio
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+logger = logging.getLogger(__name__)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CYCLE_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    @abstractmethod
+    def render(self) -> list[str]: ...
+
+    @abstractmethod
+    def snapshot(self) -> dict[tuple[str, ...], object]: ...
+
+    @abstractmethod
+    def load(self, samples: dict[tuple[str, ...], object]) -> None: ...
+
+    @abstractmethod
+    def combine(self, left: object, right: object) -> object:
+        """Merge two workers' samples that share the same labels."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> dict[tuple[str, ...], object]:
+        return dict(self._values)
+
+    def load(self, samples: dict[tuple[str, ...], object]) -> None:
+        self._values = {key: float(value) for key, value in samples.items()}
+
+    def combine(self, left: object, right: object) -> object:
+        return float(left) + float(right)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_number(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def combine(self, left: object, right: object) -> object:
+        # Per-handle gauges live in one worker; shared ones (circuit state)
+        # report the worst value any worker sees.
+        return max(float(left), float(right))
+
+
+@dataclass(slots=True)
+class _Series:
+    buckets: list[int]
+    total: float = 0.0
+    count: int = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        *,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._bounds = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series([0] * (len(self._bounds) + 1))
+        series.buckets[bisect_left(self._bounds, value)] += 1
+        series.total += value
+        series.count += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def snapshot(self) -> dict[tuple[str, ...], object]:
+        return {key: (list(series.buckets), series.total, series.count) for key, series in self._series.items()}
+
+    def load(self, samples: dict[tuple[str, ...], object]) -> None:
+        self._series = {
+            key: _Series(list(buckets), total, count) for key, (buckets, total, count) in samples.items()
+        }
+
+    def combine(self, left: object, right: object) -> object:
+        left_buckets, left_total, left_count = left
+        right_buckets, right_total, right_count = right
+        return (
+            [a + b for a, b in zip(left_buckets, right_buckets)],
+            left_total + right_total,
+            left_count + right_count,
+        )
+
+    def render(self) -> list[str]:
+        lines: list[str] = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(self._bounds + (math.inf,), series.buckets):
+                cumulative += hits
+                le = "+Inf" if bound == math.inf else _number(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{self._format_labels(key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(series.total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        *,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets=buckets))
+
+    def snapshot(self) -> dict[str, dict[tuple[str, ...], object]]:
+        """Picklable copy of every sample, for shipping to another process."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def merge(self, snapshots: Iterable[dict[str, dict[tuple[str, ...], object]]]) -> None:
+        """Replace all samples with the combination of ``snapshots`` (one per worker).
+
+        Samples with the same labels in several workers are added up (gauges
+        keep the highest value).
+        """
+        combined: dict[str, dict[tuple[str, ...], object]] = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                if name not in combined:
+                    continue
+                metric, merged = self._metrics[name], combined[name]
+                for key, value in samples.items():
+                    merged[key] = metric.combine(merged[key], value) if key in merged else value
+        for name, samples in combined.items():
+            self._metrics[name].load(samples)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide metrics ------------------------------------------------------
+REGISTRY = MetricsRegistry()
+
+TWEETS_FETCHED = REGISTRY.counter("bot_tweets_fetched_total", "Tweets returned by search.", ("handle",))
+TWEETS_SKIPPED = REGISTRY.counter(
+    "bot_tweets_skipped_total", "Tweets handled without a reply, by reason.", ("handle", "reason")
+)
+REPLIES_POSTED = REGISTRY.counter("bot_replies_posted_total", "Replies posted to Twitter.", ("handle",))
+REPLY_FAILURES = REGISTRY.counter(
+    "bot_reply_failures_total", "Queued replies given up on, by reason.", ("handle", "reason")
+)
+REPLY_RETRIES = REGISTRY.counter("bot_reply_retries_total", "Failed post attempts scheduled for retry.", ("handle",))
+OUTBOX_PENDING = REGISTRY.gauge("bot_outbox_pending", "Drafted replies waiting in the outbox.", ("handle",))
+TOKEN_BUDGET_REMAINING = REGISTRY.gauge(
+    "bot_llm_token_budget_remaining", "LLM tokens left in today's (UTC) per-account budget.", ("handle",)
+)
+WRITE_BUDGET_REMAINING = REGISTRY.gauge(
+    "bot_write_budget_remaining", "Replies left in the current posting window.", ("handle",)
+)
+CYCLE_FAILURES = REGISTRY.counter(
+    "bot_cycle_failures_total", "Polling cycles aborted by an error and retried after a backoff.", ("handle",)
+)
+CYCLE_DURATION = REGISTRY.histogram(
+    "bot_cycle_duration_seconds", "Wall time of one polling cycle.", ("handle",), buckets=CYCLE_BUCKETS
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "bot_llm_request_duration_seconds",
+    "LLM request latency by operation (classify, classify_batch, generate).",
+    ("handle", "operation"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "bot_llm_tokens_total", "LLM tokens reported in usage, by direction.", ("handle", "operation", "direction")
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "bot_llm_prompt_tokens_total",
+    "LLM input tokens by persona and whether the provider served them from its prompt cache.",
+    ("persona", "operation", "cache"),
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "bot_llm_time_to_first_token_seconds", "Delay before the first streamed reply token.", ("handle",)
+)
+LLM_RETRIES = REGISTRY.counter(
+    "bot_llm_retries_total", "LLM attempts retried after a transient failure.", ("model", "operation")
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "bot_llm_fallbacks_total", "LLM requests handed to the fallback model.", ("model", "operation")
+)
+LLM_CIRCUIT_STATE = REGISTRY.gauge(
+    "bot_llm_circuit_state", "LLM circuit breaker state per model (0 closed, 1 half-open, 2 open).", ("model",)
+)
+TWITTER_LATENCY = REGISTRY.histogram(
+    "bot_twitter_request_duration_seconds", "Twitter API request latency by endpoint.", ("handle", "endpoint")
+)
+TWITTER_RESPONSES = REGISTRY.counter(
+    "bot_twitter_responses_total", "Twitter API responses by endpoint and status.", ("handle", "endpoint", "status")
+)
+RATE_LIMIT_REMAINING = REGISTRY.gauge(
+    "bot_twitter_rate_limit_remaining", "Last x-rate-limit-remaining seen per endpoint.", ("handle", "endpoint")
+)
+TOKEN_REFRESHES = REGISTRY.counter("bot_token_refreshes_total", "OAuth2 access-token refreshes.", ("handle",))
+
+
+# HTTP endpoint -------------------------------------------------------------
+class MetricsServer:
+    """Serve ``GET /metrics`` from the running event loop.
+
+    The server is deliberately minimal: one request per connection, no
+    keep-alive, plain-text exposition format only.
+    """
+
+    def __init__(self, port: int, *, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> None:
+        self._host = host
+        self._port = port
+        self._registry = registry
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def port(self) -> int:
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+        logger.info("Serving metrics on http://%s:%s/metrics", self._host, self.port)
+
+    async def aclose(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self._registry.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -1,16 +1,48 @@
 """OpenRouter-backed helpers for classifying and drafting replies."""
 
+import asyncio
+import hashlib
 import json
 import logging
+import re
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, Mapping, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from .config import OpenAISettings
+from . import tracing
+from .cache import CacheStats, ResponseCache
+from .config import LlmConfig, OpenAISettings
+from .metrics import LLM_LATENCY, LLM_PROMPT_TOKENS, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from .resilience import ModelGuard
+from .usage import UsageLedger
 
 
 logger = logging.getLogger(__name__)
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+_BATCH_INSTRUCTIONS = (
+    "You will receive a JSON array of tweets, each with an \"id\". Apply the rules above to every "
+    "tweet independently and answer with a single JSON object that maps each tweet id (as a string) "
+    "to your decision for that tweet: \"SKIP\" when the bot should stay silent, otherwise a short "
+    "acknowledgment. Return only the JSON object, with an entry for every id."
+)
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class _EstimatedUsage:
+    """Stand-in for the provider's usage block when a stream is closed early."""
+
+    input_tokens: int
+    output_tokens: int
+    input_tokens_details: None = None
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English-heavy text.
+    return (len(text) + 3) // 4 if text else 0
 
 
 @dataclass(slots=True)
@@ -20,35 +52,99 @@ class TweetContext:
     url: Optional[str] = None
 
 
+@dataclass(slots=True)
+class PromptCacheUsage:
+    persona: str
+    operation: str
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+def prompt_cache_report(persona: Optional[str] = None) -> list[PromptCacheUsage]:
+    """Provider prompt-cache hit rates per persona and operation, from the process metrics."""
+    usage: dict[tuple[str, str], PromptCacheUsage] = {}
+    for (name, operation, cache), tokens in LLM_PROMPT_TOKENS.snapshot().items():
+        if persona is not None and name != persona:
+            continue
+        entry = usage.setdefault((name, operation), PromptCacheUsage(name, operation))
+        entry.prompt_tokens += int(tokens)
+        if cache == "hit":
+            entry.cached_tokens += int(tokens)
+    return [usage[key] for key in sorted(usage)]
+
+
 class ReplyGenerator:
-    def __init__(self, settings: OpenAISettings) -> None:
-        self._client = OpenAI(api_key=settings.api_key, base_url="https://openrouter.ai/api/v1")
+    """Classify tweets and draft replies through the OpenRouter Responses API.
+
+    Every request starts with the same persona or classifier system prompt and
+    puts the tweet last, so providers with prompt caching can reuse the
+    prefix; ``prompt_cache_key`` groups requests sharing a prefix, and
+    ``prompt_cache_control`` adds explicit breakpoints for providers that need
+    them. Cached prompt tokens are reported per persona. Every request goes
+    through ``guard`` for deadlines, retries and fallback to another model,
+    and its token usage is written to ``ledger`` when one is given.
+    """
+
+    def __init__(
+        self,
+        settings: OpenAISettings,
+        *,
+        client: Optional[AsyncOpenAI] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_replies: bool = False,
+        handle: str = "",
+        guard: Optional[ModelGuard] = None,
+        ledger: Optional[UsageLedger] = None,
+    ) -> None:
+        # Retries belong to the guard, which keeps them inside the model deadline.
+        self._client = client or AsyncOpenAI(api_key=settings.api_key, base_url=OPENROUTER_BASE_URL, max_retries=0)
+        self._guard = guard or ModelGuard(LlmConfig())
+        self._ledger = ledger
         self._settings = settings
+        self._handle = handle.lower().lstrip("@")
+        self._persona = settings.persona or self._handle
+        self._classify_options = _cache_options(settings.classification_prompt)
+        self._batch_options = _cache_options(settings.classification_prompt + _BATCH_INSTRUCTIONS)
+        self._reply_options = _cache_options(settings.reply_style_prompt)
+        self._cache = cache
+        self._cache_replies = cache_replies
+        self.cache_stats = CacheStats()
 
-    def should_reply(self, context: TweetContext) -> tuple[bool, str]:
+    async def should_reply(self, context: TweetContext) -> tuple[bool, str]:
         """Return (should_reply, raw_decision_text)."""
-        user_payload = {
-            "tweet_author": context.author_handle,
-            "tweet_text": context.text.strip(),
-        }
-        if context.url:
-            user_payload["tweet_url"] = context.url
+        cached = self._cached_verdict(context)
+        if cached is not None:
+            return cached
+        decision = await self._classify(context)
+        self._store_verdict(context, decision)
+        return decision
+
+    async def _classify(self, context: TweetContext) -> tuple[bool, str]:
+        messages = [
+            self._system_message(self._settings.classification_prompt),
+            {
+                "role": "user",
+                "content": json.dumps(_tweet_payload(context), ensure_ascii=False),
+            },
+        ]
+
+        async def request(model: str) -> object:
+            with self._observe("classify", model):
+                response = await self._client.responses.create(
+                    model=model,
+                    input=messages,
+                    max_output_tokens=self._settings.classifier_max_output_tokens,
+                    extra_body=self._classify_options,
+                )
+                self._record_usage("classify", model, response.usage)
+            return response
 
         try:
-            response = self._client.responses.create(
-                model=self._settings.classifier_model,
-                input=[
-                    {
-                        "role": "system",
-                        "content": self._settings.classification_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(user_payload, ensure_ascii=False),
-                    },
-                ],
-                max_output_tokens=10000,
-            )
+            response = await self._guard.call("classify", self._settings.classifier_model, request)
             raw = response.output_text.strip()
             if not raw:
                 logger.debug(
@@ -56,17 +152,102 @@ class ReplyGenerator:
                     response,
                 )
                 return True, ""
-            normalized = raw.strip().upper()
         except Exception as exc:  # pragma: no cover - network interaction
             logger.warning("Classification failed for tweet by @%s: %s", context.author_handle, exc)
             return False, f"error:{exc}"
 
-        if normalized.startswith("SKIP"):
-            return False, raw
-        return True, raw
+        return _decision(raw)
+
+    async def should_reply_batch(
+        self, contexts: Mapping[int, TweetContext]
+    ) -> dict[int, tuple[bool, str]]:
+        """Classify several tweets in one request; return decisions keyed by tweet id.
+
+        Cached verdicts are served locally. Tweets missing from a malformed or
+        partial batch answer are re-classified one by one.
+        """
+        decisions: dict[int, tuple[bool, str]] = {}
+        pending: dict[int, TweetContext] = {}
+        for tweet_id, context in contexts.items():
+            cached = self._cached_verdict(context)
+            if cached is None:
+                pending[tweet_id] = context
+            else:
+                decisions[tweet_id] = cached
+        fresh = await self._classify_batch(pending)
+        for tweet_id, decision in fresh.items():
+            self._store_verdict(pending[tweet_id], decision)
+        decisions.update(fresh)
+        return decisions
+
+    async def _classify_batch(
+        self, contexts: Mapping[int, TweetContext]
+    ) -> dict[int, tuple[bool, str]]:
+        if not contexts:
+            return {}
+        if len(contexts) == 1:
+            tweet_id, context = next(iter(contexts.items()))
+            return {tweet_id: await self._classify(context)}
+
+        payload = [
+            {"id": str(tweet_id), **_tweet_payload(context)}
+            for tweet_id, context in contexts.items()
+        ]
+        messages = [
+            self._system_message(self._settings.classification_prompt),
+            self._system_message(_BATCH_INSTRUCTIONS),
+            {
+                "role": "user",
+                "content": json.dumps(payload, ensure_ascii=False),
+            },
+        ]
+
+        async def request(model: str) -> object:
+            with self._observe("classify_batch", model):
+                response = await self._client.responses.create(
+                    model=model,
+                    input=messages,
+                    max_output_tokens=self._settings.classifier_max_output_tokens,
+                    extra_body=self._batch_options,
+                )
+                self._record_usage("classify_batch", model, response.usage)
+            return response
+
+        try:
+            response = await self._guard.call("classify_batch", self._settings.classifier_model, request)
+            raw = response.output_text.strip()
+        except Exception as exc:  # pragma: no cover - network interaction
+            logger.warning("Batch classification failed for %s tweets: %s", len(contexts), exc)
+            return {tweet_id: (False, f"error:{exc}") for tweet_id in contexts}
+
+        decisions = _parse_batch_decisions(raw, contexts.keys())
+        missing = [tweet_id for tweet_id in contexts if tweet_id not in decisions]
+        if missing:
+            logger.info(
+                "Batch classifier answer covered %s/%s tweets; falling back for the rest",
+                len(contexts) - len(missing),
+                len(contexts),
+            )
+            logger.debug("Malformed batch classifier output: %r", raw)
+            fallback = await asyncio.gather(*(self._classify(contexts[tweet_id]) for tweet_id in missing))
+            decisions.update(zip(missing, fallback))
+        return decisions
 
-    def generate(self, context: TweetContext) -> str:
+    async def generate(self, context: TweetContext) -> str:
         """Craft a promotional yet compliant reply for PunkStrategyStrategy."""
+        use_cache = self._cache is not None and self._cache_replies
+        if use_cache:
+            cached = self._cache.get(
+                "reply",
+                self._settings.model,
+                self._settings.reply_style_prompt,
+                context.text,
+            )
+            if cached is not None and cached.get("text"):
+                self.cache_stats.hits += 1
+                return str(cached["text"])
+            self.cache_stats.misses += 1
+
         user_prompt = (
             f"Tweet author: @{context.author_handle}\n"
             f"Tweet content: {context.text.strip()}"
@@ -74,21 +255,239 @@ class ReplyGenerator:
         if context.url:
             user_prompt += f"\nTweet URL: {context.url}"
 
-        response = self._client.responses.create(
-            model=self._settings.model,
-            input=[
-                {
-                    "role": "system",
-                    "content": self._settings.reply_style_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt,
-                },
-            ],
-            max_output_tokens=10000,
+        messages = [
+            self._system_message(self._settings.reply_style_prompt),
+            {
+                "role": "user",
+                "content": user_prompt,
+            },
+        ]
+        if self._settings.stream_replies:
+            reply = await self._guard.call(
+                "generate", self._settings.model, lambda model: self._generate_streaming(model, messages)
+            )
+        else:
+            reply = await self._guard.call(
+                "generate", self._settings.model, lambda model: self._generate_once(model, messages)
+            )
+
+        logger.debug("Raw reply output for @%s: %r", context.author_handle, reply)
+
+        reply = reply.strip()
+        if use_cache and reply:
+            self._cache.put(
+                "reply",
+                self._settings.model,
+                self._settings.reply_style_prompt,
+                context.text,
+                {"text": reply},
+            )
+        return reply
+
+    async def _generate_once(self, model: str, messages: list[dict[str, object]]) -> str:
+        with self._observe("generate", model):
+            response = await self._client.responses.create(
+                model=model,
+                input=messages,
+                max_output_tokens=self._settings.reply_max_output_tokens,
+                extra_body=self._reply_options,
+            )
+            self._record_usage("generate", model, response.usage)
+        return response.output_text
+
+    async def _generate_streaming(self, model: str, messages: list[dict[str, object]]) -> str:
+        """Stream the reply and stop reading once it can no longer fit in a tweet.
+
+        Anything past ``reply_char_limit`` would be cut by the bot anyway, so
+        the stream is closed as soon as the collapsed text reaches the limit
+        plus one word of slack for word-boundary truncation. Usage only
+        arrives with ``response.completed``; when the stream ends without it
+        the tokens are estimated from the prompt and the text read so far.
+        """
+        cutoff = self._settings.reply_char_limit + 20
+        parts: list[str] = []
+        length = 0
+        completed = False
+        started = time.perf_counter()
+        with self._observe("generate", model) as llm_span:
+            stream = await self._client.responses.create(
+                model=model,
+                input=messages,
+                max_output_tokens=self._settings.reply_max_output_tokens,
+                stream=True,
+                extra_body=self._reply_options,
+            )
+            try:
+                async for event in stream:
+                    if event.type == "response.completed":
+                        completed = True
+                        self._record_usage("generate", model, event.response.usage)
+                    if event.type != "response.output_text.delta":
+                        continue
+                    if not parts:
+                        first_token = time.perf_counter() - started
+                        LLM_TIME_TO_FIRST_TOKEN.observe(first_token, handle=self._handle)
+                        llm_span.set_attribute("gen_ai.response.time_to_first_token", first_token)
+                    parts.append(event.delta)
+                    length += len(event.delta)
+                    if length >= cutoff and len(" ".join("".join(parts).split())) >= cutoff:
+                        logger.debug("Reply reached %s characters; closing stream early", length)
+                        llm_span.set_attribute("bot.stream_closed_early", True)
+                        break
+            finally:
+                await stream.close()
+                if not completed:
+                    llm_span.set_attribute("bot.usage_estimated", True)
+                    self._record_usage(
+                        "generate",
+                        model,
+                        _EstimatedUsage(
+                            input_tokens=_estimate_tokens(json.dumps(messages, ensure_ascii=False)),
+                            output_tokens=_estimate_tokens("".join(parts)),
+                        ),
+                    )
+        return "".join(parts)
+
+    @contextmanager
+    def _observe(self, operation: str, model: str) -> Iterator[tracing.Span]:
+        """Time one LLM request for metrics and wrap it in a trace span."""
+        started = time.perf_counter()
+        try:
+            with tracing.span(
+                f"llm {operation}",
+                attributes={"gen_ai.operation.name": operation, "gen_ai.request.model": model},
+            ) as llm_span:
+                yield llm_span
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - started, handle=self._handle, operation=operation)
+
+    def _record_usage(self, operation: str, model: str, usage: object) -> None:
+        if usage is None:
+            return
+        llm_span = tracing.current_span()
+        for direction in ("input", "output"):
+            tokens = getattr(usage, f"{direction}_tokens", None)
+            if not tokens:
+                continue
+            LLM_TOKENS.inc(tokens, handle=self._handle, operation=operation, direction=direction)
+            if llm_span is not None:
+                llm_span.set_attribute(f"gen_ai.usage.{direction}_tokens", tokens)
+        input_tokens = getattr(usage, "input_tokens", None) or 0
+        details = getattr(usage, "input_tokens_details", None)
+        cached = min(input_tokens, getattr(details, "cached_tokens", None) or 0)
+        if self._ledger is not None:
+            self._ledger.record(
+                handle=self._handle,
+                persona=self._persona,
+                model=model,
+                operation=operation,
+                input_tokens=input_tokens,
+                cached_tokens=cached,
+                output_tokens=getattr(usage, "output_tokens", None) or 0,
+            )
+        if not input_tokens:
+            return
+        LLM_PROMPT_TOKENS.inc(cached, persona=self._persona, operation=operation, cache="hit")
+        LLM_PROMPT_TOKENS.inc(input_tokens - cached, persona=self._persona, operation=operation, cache="miss")
+        if llm_span is not None:
+            llm_span.set_attribute("gen_ai.usage.cache_read.input_tokens", cached)
+
+    # Prompt-cache helpers ----------------------------------------------
+    def _system_message(self, text: str) -> dict[str, object]:
+        if not self._settings.prompt_cache_control:
+            return {"role": "system", "content": text}
+        return {
+            "role": "system",
+            "content": [{"type": "input_text", "text": text, "cache_control": {"type": "ephemeral"}}],
+        }
+
+    # Cache helpers -----------------------------------------------------
+    def _cached_verdict(self, context: TweetContext) -> Optional[tuple[bool, str]]:
+        if self._cache is None:
+            return None
+        cached = self._cache.get(
+            "verdict",
+            self._settings.classifier_model,
+            self._settings.classification_prompt,
+            context.text,
         )
+        if cached is None:
+            self.cache_stats.misses += 1
+            return None
+        self.cache_stats.hits += 1
+        return bool(cached.get("should_reply")), str(cached.get("note", ""))
+
+    def _store_verdict(self, context: TweetContext, decision: tuple[bool, str]) -> None:
+        should_reply, note = decision
+        if self._cache is None or note.startswith("error:"):
+            return
+        self._cache.put(
+            "verdict",
+            self._settings.classifier_model,
+            self._settings.classification_prompt,
+            context.text,
+            {"should_reply": should_reply, "note": note},
+        )
+
+
+def _cache_options(prefix: str) -> dict[str, str]:
+    # Requests sharing a prefix share a key, so the provider can route them to a warm cache.
+    return {"prompt_cache_key": "prefix-" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:24]}
 
-        logger.debug("Raw reply output for @%s: %r", context.author_handle, response.output_text)
 
-        return response.output_text.strip()
+def _tweet_payload(context: TweetContext) -> dict[str, str]:
+    payload = {
+        "tweet_author": context.author_handle,
+        "tweet_text": context.text.strip(),
+    }
+    if context.url:
+        payload["tweet_url"] = context.url
+    return payload
+
+
+def _decision(raw: str) -> tuple[bool, str]:
+    if raw.strip().upper().startswith("SKIP"):
+        return False, raw
+    return True, raw
+
+
+def _parse_batch_decisions(raw: str, tweet_ids: Iterable[int]) -> dict[int, tuple[bool, str]]:
+    """Extract per-tweet decisions from a batch answer, ignoring anything unparsable."""
+    text = _JSON_FENCE.sub("", raw.strip())
+    start, end = text.find("{"), text.rfind("}")
+    list_start, list_end = text.find("["), text.rfind("]")
+    if list_start != -1 and (start == -1 or list_start < start):
+        start, end = list_start, list_end
+    if start == -1 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(text[start : end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    # Accept {"<id>": "decision"} as well as [{"id": ..., "decision": ...}].
+    if isinstance(parsed, list):
+        pairs = [
+            (item.get("id"), item.get("decision", item.get("result")))
+            for item in parsed
+            if isinstance(item, dict)
+        ]
+    elif isinstance(parsed, dict):
+        pairs = list(parsed.items())
+    else:
+        return {}
+
+    wanted = set(tweet_ids)
+    decisions: dict[int, tuple[bool, str]] = {}
+    for key, value in pairs:
+        try:
+            tweet_id = int(str(key).strip())
+        except ValueError:
+            continue
+        if tweet_id not in wanted or value is None:
+            continue
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False)
+        raw_value = str(value).strip()
+        decisions[tweet_id] = _decision(raw_value) if raw_value else (True, "")
+    return decisions
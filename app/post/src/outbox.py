@@ -0,0 +1,143 @@
+"""Durable queue of drafted replies waiting to be posted."""
+
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass(slots=True)
+class OutboxEntry:
+    tweet_id: int
+    reply: str
+    priority: float
+    created_at: float
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class ReplyOutbox:
+    """Per-account SQLite (WAL) table of replies that still have to be posted.
+
+    Replies are enqueued as soon as they are drafted and only deleted once
+    Twitter accepted them or the poster gave up, so a failed post or a crash
+    never costs another classification and generation. Due entries come out
+    highest ``priority`` first; failed ones are rescheduled with jittered
+    exponential backoff. Post times of the last ``sent_retention`` seconds are
+    kept so write budgets survive a restart.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        base_delay: float = 30.0,
+        max_delay: float = 1800.0,
+        max_attempts: int = 8,
+        sent_retention: float = 86400.0,
+    ) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._max_attempts = max(1, max_attempts)
+        self._sent_retention = sent_retention
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: set[int] = set()
+
+    def __len__(self) -> int:
+        self._db()
+        return len(self._pending)
+
+    def __contains__(self, tweet_id: object) -> bool:
+        self._db()
+        return tweet_id in self._pending
+
+    def enqueue(self, tweet_id: int, reply: str, *, priority: float = 0.0) -> None:
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO outbox"
+                " (tweet_id, reply, priority, created_at, next_attempt_at, attempts)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (tweet_id, reply, priority, now, now),
+            )
+        self._pending.add(tweet_id)
+
+    def next_due(self, now: Optional[float] = None) -> Optional[OutboxEntry]:
+        row = self._db().execute(
+            "SELECT tweet_id, reply, priority, created_at, attempts, last_error FROM outbox"
+            " WHERE next_attempt_at <= ? ORDER BY priority DESC, created_at LIMIT 1",
+            (now if now is not None else time.time(),),
+        ).fetchone()
+        return OutboxEntry(*row) if row else None
+
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the earliest entry is due, or ``None`` when the outbox is empty."""
+        (next_at,) = self._db().execute("SELECT MIN(next_attempt_at) FROM outbox").fetchone()
+        if next_at is None:
+            return None
+        return max(0.0, next_at - (now if now is not None else time.time()))
+
+    def retry_later(self, entry: OutboxEntry, error: str) -> Optional[float]:
+        """Record a failed attempt; return the backoff delay, or ``None`` once attempts are exhausted."""
+        entry.attempts += 1
+        entry.last_error = error
+        if entry.attempts >= self._max_attempts:
+            return None
+        ceiling = min(self._max_delay, self._base_delay * (2 ** (entry.attempts - 1)))
+        delay = random.uniform(ceiling / 2, ceiling)
+        with self._db() as conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE tweet_id = ?",
+                (entry.attempts, error[:500], time.time() + delay, entry.tweet_id),
+            )
+        return delay
+
+    def remove(self, tweet_id: int) -> None:
+        with self._db() as conn:
+            conn.execute("DELETE FROM outbox WHERE tweet_id = ?", (tweet_id,))
+        self._pending.discard(tweet_id)
+
+    def mark_sent(self, tweet_id: int, now: Optional[float] = None) -> None:
+        """Remove a posted reply and log its post time."""
+        now = now if now is not None else time.time()
+        with self._db() as conn:
+            conn.execute("DELETE FROM outbox WHERE tweet_id = ?", (tweet_id,))
+            conn.execute("INSERT INTO sent (tweet_id, posted_at) VALUES (?, ?)", (tweet_id, now))
+            conn.execute("DELETE FROM sent WHERE posted_at < ?", (now - self._sent_retention,))
+        self._pending.discard(tweet_id)
+
+    def sent_since(self, cutoff: float) -> list[float]:
+        rows = self._db().execute("SELECT posted_at FROM sent WHERE posted_at > ? ORDER BY posted_at", (cutoff,))
+        return [posted_at for (posted_at,) in rows]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self._path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " tweet_id INTEGER PRIMARY KEY,"
+                " reply TEXT NOT NULL,"
+                " priority REAL NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " next_attempt_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL,"
+                " last_error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sent (tweet_id INTEGER NOT NULL, posted_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sent_posted_at ON sent (posted_at)")
+            conn.commit()
+            self._conn = conn
+            self._pending = {tweet_id for (tweet_id,) in conn.execute("SELECT tweet_id FROM outbox")}
+        return self._conn
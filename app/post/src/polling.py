@@ -0,0 +1,57 @@
+"""Adaptive polling interval driven by observed tweet velocity."""
+
+from typing import Optional
+
+from .rate_limit import RateLimitBudget
+
+
+class AdaptivePollInterval:
+    """Shrink the interval after full fetches and stretch it after empty ones.
+
+    The result always stays within ``[min_seconds, max_seconds]`` and never
+    polls faster than the remaining search budget allows before its reset.
+    With ``min_seconds == max_seconds`` the interval is fixed.
+    """
+
+    def __init__(
+        self,
+        base_seconds: float,
+        *,
+        min_seconds: float,
+        max_seconds: float,
+        speedup: float = 0.5,
+        slowdown: float = 1.5,
+    ) -> None:
+        self._min = max(1.0, min(min_seconds, max_seconds))
+        self._max = max(self._min, max_seconds)
+        self._speedup = speedup
+        self._slowdown = slowdown
+        self._current = min(max(float(base_seconds), self._min), self._max)
+
+    @property
+    def current(self) -> float:
+        return self._current
+
+    def observe(
+        self,
+        *,
+        fetched: int,
+        capacity: int,
+        requests_per_cycle: int = 1,
+        budget: Optional[RateLimitBudget] = None,
+    ) -> float:
+        """Record one cycle's fetch size and return the next sleep interval."""
+        if capacity > 0 and fetched >= capacity:
+            self._current *= self._speedup
+        elif fetched == 0:
+            self._current *= self._slowdown
+        self._current = min(max(self._current, self._min), self._max)
+
+        interval = self._current
+        if budget is not None and budget.remaining is not None:
+            until_reset = budget.seconds_until_reset()
+            if budget.remaining <= 0:
+                interval = max(interval, until_reset)
+            else:
+                interval = max(interval, until_reset * requests_per_cycle / budget.remaining)
+        return interval
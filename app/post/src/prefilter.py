@@ -0,0 +1,69 @@
+"""Cheap in-process rules that run before any LLM call."""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from .config import PrefilterConfig
+from .twitter_service import Tweet
+
+
+DROP = "drop"
+FAST_TRACK = "fast_track"
+PASS = "pass"
+
+_URL_RE = re.compile(r"https?://\S+")
+_HASHTAG_RE = re.compile(r"(?:^|\s)[#$]\w+")
+_MENTION_RE = re.compile(r"(?:^|\s)@\w+")
+
+
+@dataclass(slots=True)
+class PrefilterResult:
+    action: str
+    reason: str = ""
+
+
+class Prefilter:
+    """Drop obvious spam and fast-track clear matches without a network call.
+
+    Rules are checked in order: blocked authors, drop patterns, structural
+    limits (links, hashtags/cashtags, mentions, word count), then fast-track
+    patterns. Anything left passes through to the LLM classifier.
+    """
+
+    def __init__(self, config: PrefilterConfig) -> None:
+        self._config = config
+        self._blocked = frozenset(config.blocked_authors)
+        self._drop = [(pattern, re.compile(pattern)) for pattern in config.drop_patterns]
+        self._fast_track = [(pattern, re.compile(pattern)) for pattern in config.fast_track_patterns]
+
+    def evaluate(self, tweet: Tweet) -> PrefilterResult:
+        if not self._config.enabled:
+            return PrefilterResult(PASS)
+        if tweet.author_handle.lower() in self._blocked:
+            return PrefilterResult(DROP, "blocked_author")
+        text = tweet.text
+        for pattern, compiled in self._drop:
+            if compiled.search(text):
+                return PrefilterResult(DROP, f"pattern:{pattern}")
+        reason = self._structural_reason(text)
+        if reason:
+            return PrefilterResult(DROP, reason)
+        for pattern, compiled in self._fast_track:
+            if compiled.search(text):
+                return PrefilterResult(FAST_TRACK, f"pattern:{pattern}")
+        return PrefilterResult(PASS)
+
+    def _structural_reason(self, text: str) -> Optional[str]:
+        config = self._config
+        links = len(_URL_RE.findall(text))
+        if config.max_links is not None and links > config.max_links:
+            return "too_many_links"
+        if config.max_hashtags is not None and len(_HASHTAG_RE.findall(text)) > config.max_hashtags:
+            return "too_many_hashtags"
+        if config.max_mentions is not None and len(_MENTION_RE.findall(text)) > config.max_mentions:
+            return "too_many_mentions"
+        words = _MENTION_RE.sub(" ", _URL_RE.sub(" ", text)).split()
+        if config.min_words and len(words) < config.min_words:
+            return "link_dump" if links else "too_short"
+        return None
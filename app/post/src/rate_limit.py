@@ -0,0 +1,139 @@
+"""Rate-limit bookkeeping driven by Twitter's ``x-rate-limit-*`` response headers."""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from .metrics import RATE_LIMIT_REMAINING
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RateLimitBudget:
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None
+
+    def seconds_until_reset(self, now: Optional[float] = None) -> float:
+        if self.reset_at is None:
+            return 0.0
+        return max(0.0, self.reset_at - (now if now is not None else time.time()))
+
+
+@dataclass(slots=True)
+class _Bucket:
+    budget: RateLimitBudget = field(default_factory=RateLimitBudget)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_slot: float = 0.0
+
+
+class RateLimiter:
+    """Token buckets per (account, endpoint), refilled from response headers.
+
+    ``acquire`` spends one token before a request. When the bucket is empty
+    it waits for the advertised reset; once fewer than ``low_water`` of the
+    window remain it spaces the leftover requests evenly until the reset, so
+    a busy account degrades into steady throughput instead of a 429 wall.
+    """
+
+    def __init__(
+        self,
+        *,
+        low_water: float = 0.1,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_reset_wait: float = 900.0,
+    ) -> None:
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+        self._low_water = low_water
+        self.max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._max_reset_wait = max_reset_wait
+
+    def budget(self, account: str, endpoint: str) -> Optional[RateLimitBudget]:
+        bucket = self._buckets.get((account, endpoint))
+        if bucket is None or bucket.budget.remaining is None:
+            return None
+        return bucket.budget
+
+    async def acquire(self, account: str, endpoint: str) -> None:
+        bucket = self._buckets.setdefault((account, endpoint), _Bucket())
+        async with bucket.lock:
+            budget = bucket.budget
+            now = time.time()
+            if budget.reset_at is not None and now >= budget.reset_at:
+                # Window rolled over; the next response reports the new budget.
+                budget.remaining = None
+                budget.reset_at = None
+                bucket.next_slot = 0.0
+            if budget.remaining is None:
+                return
+            delay = 0.0
+            if budget.remaining <= 0:
+                delay = min(budget.seconds_until_reset(now), self._max_reset_wait)
+                logger.warning(
+                    "Rate limit exhausted for %s %s; waiting %.0f seconds for reset",
+                    account,
+                    endpoint,
+                    delay,
+                )
+            elif budget.limit and budget.remaining < budget.limit * self._low_water:
+                spacing = budget.seconds_until_reset(now) / budget.remaining
+                delay = max(0.0, bucket.next_slot - now)
+                bucket.next_slot = max(now, bucket.next_slot) + spacing
+                if delay:
+                    logger.info(
+                        "Pacing %s %s: %s requests left, next slot in %.1f seconds",
+                        account,
+                        endpoint,
+                        budget.remaining,
+                        delay,
+                    )
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if budget.remaining is not None and budget.remaining > 0:
+                budget.remaining -= 1
+
+    def update(self, account: str, endpoint: str, response: httpx.Response) -> None:
+        headers = response.headers
+        remaining = _int_header(headers, "x-rate-limit-remaining")
+        if remaining is None:
+            return
+        bucket = self._buckets.setdefault((account, endpoint), _Bucket())
+        bucket.budget.remaining = remaining
+        bucket.budget.limit = _int_header(headers, "x-rate-limit-limit") or bucket.budget.limit
+        reset = _int_header(headers, "x-rate-limit-reset")
+        if reset is not None:
+            bucket.budget.reset_at = float(reset)
+        if response.status_code == 429:
+            bucket.budget.remaining = 0
+        RATE_LIMIT_REMAINING.set(bucket.budget.remaining, handle=account, endpoint=endpoint)
+
+    def retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry ``attempt`` (0-based), with full jitter."""
+        if response is not None and response.status_code == 429:
+            reset = _int_header(response.headers, "x-rate-limit-reset")
+            if reset is not None:
+                wait = max(0.0, reset - time.time())
+                return min(wait, self._max_reset_wait) + random.uniform(0, 1)
+        ceiling = min(self._max_delay, self._base_delay * (2**attempt))
+        return random.uniform(0, ceiling)
+
+
+def _int_header(headers: httpx.Headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
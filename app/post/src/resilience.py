@@ -0,0 +1,192 @@
+"""Deadlines, retries and circuit breaking around LLM requests."""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+from .config import LlmConfig
+from .metrics import LLM_CIRCUIT_STATE, LLM_FALLBACKS, LLM_RETRIES
+
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose breaker is open."""
+
+    def __init__(self, model: str) -> None:
+        super().__init__(f"circuit open for {model}")
+        self.model = model
+
+
+class CircuitBreaker:
+    """Failure-rate breaker over the last ``window`` calls to one model.
+
+    The breaker opens once at least ``min_calls`` outcomes are recorded and
+    the failure share reaches ``failure_rate``. After ``cooldown`` seconds a
+    single probe call is let through: success closes the breaker, failure
+    opens it for another cooldown.
+    """
+
+    def __init__(self, model: str, *, window: int, min_calls: int, failure_rate: float, cooldown: float) -> None:
+        self.model = model
+        self._outcomes: deque[bool] = deque(maxlen=max(1, window))
+        self._min_calls = max(1, min_calls)
+        self._failure_rate = failure_rate
+        self._cooldown = cooldown
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        LLM_CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], model=model)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        if self._state == OPEN and now - self._opened_at >= self._cooldown:
+            self._set_state(HALF_OPEN)
+        if self._state == CLOSED:
+            return True
+        if self._state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, success: bool, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.monotonic()
+        if self._state == HALF_OPEN:
+            self._probing = False
+            if success:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            else:
+                self._trip(now)
+            return
+        if self._state == OPEN:
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self._min_calls and failures / len(self._outcomes) >= self._failure_rate:
+            self._trip(now)
+
+    def release(self) -> None:
+        """Give the probe slot back when a call was cancelled before it finished."""
+        self._probing = False
+
+    def _trip(self, now: float) -> None:
+        self._opened_at = now
+        self._set_state(OPEN)
+        logger.warning("Circuit for %s opened; fast-failing for %.0f seconds", self.model, self._cooldown)
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.info("Circuit for %s: %s -> %s", self.model, self._state, state)
+        self._state = state
+        LLM_CIRCUIT_STATE.set(_STATE_VALUES[state], model=self.model)
+
+
+class ModelGuard:
+    """Run LLM requests under per-model deadlines, retries and breakers.
+
+    Each attempt is cancelled after the model's ``timeout_for`` deadline.
+    Transient failures (timeouts, connection errors, 429 and 5xx) are retried
+    up to ``max_retries`` times with full-jitter exponential backoff and count
+    against the model's breaker. When the breaker is open or the retries are
+    used up, ``fallback_model`` gets the request instead. One guard is shared
+    by every bot of a process so they see the same breaker state.
+    """
+
+    def __init__(self, config: LlmConfig, *, rng: Optional[random.Random] = None) -> None:
+        self._config = config
+        self._rng = rng or random.Random()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            config = self._config
+            breaker = self._breakers[model] = CircuitBreaker(
+                model,
+                window=config.breaker_window,
+                min_calls=config.breaker_min_calls,
+                failure_rate=config.breaker_failure_rate,
+                cooldown=config.breaker_cooldown_seconds,
+            )
+        return breaker
+
+    async def call(self, operation: str, model: str, request: Callable[[str], Awaitable[T]]) -> T:
+        """Await ``request(model)``, falling back to ``fallback_model`` on transient failure."""
+        candidates = [model]
+        fallback = self._config.fallback_model
+        if fallback and fallback != model:
+            candidates.append(fallback)
+        error: Exception = CircuitOpenError(model)
+        for candidate in candidates:
+            if candidate != model:
+                logger.info("Falling back from %s to %s for %s: %s", model, candidate, operation, _describe(error))
+                LLM_FALLBACKS.inc(model=candidate, operation=operation)
+            try:
+                return await self._attempt(operation, candidate, request)
+            except Exception as exc:
+                if not is_transient(exc):
+                    raise
+                error = exc
+        raise error
+
+    async def _attempt(self, operation: str, model: str, request: Callable[[str], Awaitable[T]]) -> T:
+        breaker = self.breaker(model)
+        timeout = self._config.timeout_for(model)
+        for attempt in range(self._config.max_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(model)
+            try:
+                async with asyncio.timeout(timeout):
+                    result = await request(model)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as exc:
+                if not is_transient(exc):
+                    # The model answered; the request itself was bad.
+                    breaker.record(True)
+                    raise
+                breaker.record(False)
+                if attempt == self._config.max_retries:
+                    raise
+                ceiling = min(
+                    self._config.retry_max_delay_seconds,
+                    self._config.retry_base_delay_seconds * (2**attempt),
+                )
+                delay = self._rng.uniform(0, ceiling)
+                logger.debug("%s on %s failed (%s); retrying in %.2fs", operation, model, _describe(exc), delay)
+                LLM_RETRIES.inc(model=model, operation=operation)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record(True)
+                return result
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, CircuitOpenError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+def _describe(exc: BaseException) -> str:
+    return str(exc) or type(exc).__name__
@@ -0,0 +1,140 @@
+"""Shared recent-search fan-out for bots that watch the same query."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from .twitter_service import Tweet, TwitterClient
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _SearchEntry:
+    fetched_at: float
+    max_results: int
+    max_pages: int
+    page_size: int
+    pages: list[list[Tweet]] = field(default_factory=list)
+    done: bool = False
+    error: Optional[BaseException] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def covers(self, max_results: int, max_pages: int, page_size: int) -> bool:
+        return max_results <= self.max_results and max_pages <= self.max_pages and page_size == self.page_size
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+@dataclass(slots=True)
+class _QueryState:
+    subscribers: set[str] = field(default_factory=set)
+    # Keyed by the since_id the search was made from. A capped result only
+    # answers bots at exactly that since_id: reusing it for a bot that is
+    # further ahead would hand it the older, capped tweets and starve it.
+    entries: dict[Optional[int], _SearchEntry] = field(default_factory=dict)
+
+
+class SearchCoordinator:
+    """Deduplicate ``/tweets/search/recent`` calls across accounts.
+
+    Bots with an identical ``search_query`` share one paginated search per
+    polling interval. Results are shared between bots at the same
+    ``since_id``; since every subscriber sees the same tweets, their
+    ``since_id`` values advance together and after the first cycle they share
+    every fetch. A bot that fell behind or ran ahead gets its own request, so
+    per-account bookkeeping is unchanged and no tweets are lost.
+
+    Pages are fetched by a background task and streamed to every subscriber
+    as they arrive, so classification starts before pagination finishes.
+    Each page is handed over whole so callers can order it by popularity.
+    """
+
+    def __init__(self) -> None:
+        self._queries: dict[str, _QueryState] = {}
+        self._producers: set[asyncio.Task] = set()
+        self.fetches = 0
+        self.shared_hits = 0
+
+    def subscribe(self, subscriber: str, query: str) -> None:
+        self._queries.setdefault(query, _QueryState()).subscribers.add(subscriber)
+
+    async def stream(
+        self,
+        subscriber: str,
+        client: TwitterClient,
+        *,
+        max_results: int,
+        since_id: Optional[int],
+        max_age: float,
+        max_pages: int = 1,
+        page_size: int = 100,
+    ) -> AsyncIterator[list[Tweet]]:
+        query = client.search_query
+        state = self._queries.setdefault(query, _QueryState())
+        state.subscribers.add(subscriber)
+        now = time.monotonic()
+        for key, stale in list(state.entries.items()):
+            if stale.done and now - stale.fetched_at >= max_age:
+                del state.entries[key]
+        entry = state.entries.get(since_id)
+        if entry is not None and entry.covers(max_results, max_pages, page_size):
+            self.shared_hits += 1
+            logger.info(
+                "Reusing shared search results for %r fetched %.0f seconds ago",
+                query,
+                now - entry.fetched_at,
+            )
+        else:
+            entry = _SearchEntry(now, max_results, max_pages, page_size)
+            state.entries[since_id] = entry
+            self.fetches += 1
+            producer = asyncio.create_task(
+                self._produce(state, since_id, entry, client), name=f"search-{subscriber.lower()}"
+            )
+            self._producers.add(producer)
+            producer.add_done_callback(self._producers.discard)
+        index = 0
+        while True:
+            changed = entry.changed
+            while index < len(entry.pages):
+                yield entry.pages[index]
+                index += 1
+            if entry.done:
+                break
+            await changed.wait()
+        if entry.error is not None:
+            raise entry.error
+
+    async def aclose(self) -> None:
+        for producer in list(self._producers):
+            producer.cancel()
+        await asyncio.gather(*self._producers, return_exceptions=True)
+
+    async def _produce(
+        self, state: _QueryState, since_id: Optional[int], entry: _SearchEntry, client: TwitterClient
+    ) -> None:
+        try:
+            async for page in client.iter_recent_pages(
+                max_tweets=entry.max_results,
+                since_id=since_id,
+                max_pages=entry.max_pages,
+                page_size=entry.page_size,
+            ):
+                entry.pages.append(page)
+                entry.notify()
+        except BaseException as exc:
+            # Only a failed first page raises; let the next cycle search again.
+            entry.error = exc
+            if state.entries.get(since_id) is entry:
+                del state.entries[since_id]
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            entry.done = True
+            entry.notify()
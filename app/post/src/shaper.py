@@ -0,0 +1,71 @@
+"""Per-account reply budget that spends scarce write slots on the best tweets."""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .config import PostingConfig
+
+
+POST = "post"
+DEFER = "defer"
+DROP = "drop"
+
+
+@dataclass(slots=True)
+class ShaperDecision:
+    action: str
+    delay: float = 0.0
+
+
+class WriteShaper:
+    """Sliding-window budget of ``max_replies`` posts per ``window_seconds``.
+
+    Candidates are offered highest priority first. Once only
+    ``reserved_replies`` slots are left in the window, replies scoring below
+    ``priority_score`` stop getting slots: they are deferred until the window
+    frees up, or dropped when ``low_value_action`` is ``drop``. With the budget
+    exhausted every reply waits for the oldest post to leave the window.
+    """
+
+    def __init__(self, config: PostingConfig, sent_at: Iterable[float] = ()) -> None:
+        self._config = config
+        self._sent: deque[float] = deque(sorted(sent_at))
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.enabled and self._config.max_replies > 0
+
+    def remaining(self, now: Optional[float] = None) -> Optional[int]:
+        if not self.enabled:
+            return None
+        self._expire(now if now is not None else time.time())
+        return max(0, self._config.max_replies - len(self._sent))
+
+    def decide(self, priority: float, now: Optional[float] = None) -> ShaperDecision:
+        if not self.enabled:
+            return ShaperDecision(POST)
+        now = now if now is not None else time.time()
+        remaining = self.remaining(now)
+        reserved = self._config.reserved_replies
+        if remaining == 0:
+            return ShaperDecision(DEFER, self._seconds_until_free(1, now))
+        if remaining > reserved or priority >= self._config.priority_score:
+            return ShaperDecision(POST)
+        if self._config.low_value_action == DROP:
+            return ShaperDecision(DROP)
+        # Wait until enough posts age out that a non-reserved slot is free again.
+        return ShaperDecision(DEFER, self._seconds_until_free(reserved - remaining + 1, now))
+
+    def record(self, now: Optional[float] = None) -> None:
+        self._sent.append(now if now is not None else time.time())
+
+    def _seconds_until_free(self, slots: int, now: float) -> float:
+        index = min(len(self._sent), max(1, slots)) - 1
+        return max(0.0, self._sent[index] + self._config.window_seconds - now) if self._sent else 0.0
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self._config.window_seconds
+        while self._sent and self._sent[0] <= cutoff:
+            self._sent.popleft()
@@ -0,0 +1,70 @@
+"""CLI cold-start benchmark: time fresh interpreters running a ``src.main`` command.
+
+Each run starts ``python -X importtime -m src.main <args>`` in a new process,
+so nothing is shared with the caller's imports. Besides wall time the report
+lists which of the bot's heavy runtime packages were imported, which is what
+the lazy imports in ``main`` and ``config`` are meant to avoid.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("openai", "httpx", "yaml", "dotenv")
+DEFAULT_ARGS = ("auth", "link", "--help")
+
+
+@dataclass(slots=True)
+class StartupReport:
+    args: tuple[str, ...]
+    wall_times: list[float] = field(default_factory=list)
+    import_times: list[float] = field(default_factory=list)
+    heavy_modules: tuple[str, ...] = ()
+
+    @property
+    def median_wall(self) -> float:
+        return statistics.median(self.wall_times)
+
+    @property
+    def median_import(self) -> float:
+        return statistics.median(self.import_times)
+
+
+def _parse_importtime(importtime_log: str) -> tuple[float, set[str]]:
+    """Total import time (sum of top-level entries) and the top-level packages loaded."""
+    total_us = 0
+    packages: set[str] = set()
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        module = parts[2].strip()
+        packages.add(module.split(".")[0])
+        if not parts[2][1:].startswith(" "):
+            total_us += int(parts[1])
+    return total_us / 1_000_000, packages
+
+
+def measure_startup(runs: int = 10, args: tuple[str, ...] = DEFAULT_ARGS) -> StartupReport:
+    report = StartupReport(args=tuple(args))
+    heavy: set[str] = set()
+    command = [sys.executable, "-X", "importtime", "-m", "src.main", *args]
+    for _ in range(max(1, runs)):
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if completed.returncode != 0:
+            raise RuntimeError(f"启动命令失败 ({completed.returncode}): {completed.stderr.strip()[-500:]}")
+        report.wall_times.append(elapsed)
+        import_seconds, packages = _parse_importtime(completed.stderr)
+        report.import_times.append(import_seconds)
+        heavy.update(name for name in HEAVY_MODULES if name in packages)
+    report.heavy_modules = tuple(sorted(heavy))
+    return report
@@ -1,16 +1,72 @@
 """Unified persistence helpers for bot state and OAuth tokens."""
 
 import json
+import os
+import sqlite3
 import time
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+
+
+DEFAULT_HISTORY = 5000
+
+
+class RecentIdSet:
+    """Bounded set of tweet ids with O(1) membership and oldest-first eviction.
+
+    Ids live in a fixed-capacity ring buffer of signed 64-bit integers with a
+    hash index alongside it; once full, each new id overwrites the oldest.
+    """
+
+    __slots__ = ("_capacity", "_ring", "_head", "_index")
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY, ids: Iterable[int] = ()) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._capacity = capacity
+        self._ring = array("q")
+        self._head = 0
+        self._index: set[int] = set()
+        for tweet_id in ids:
+            self.add(tweet_id)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def add(self, tweet_id: int) -> None:
+        if tweet_id in self._index:
+            return
+        if len(self._ring) < self._capacity:
+            self._ring.append(tweet_id)
+        else:
+            self._index.discard(self._ring[self._head])
+            self._ring[self._head] = tweet_id
+            self._head = (self._head + 1) % self._capacity
+        self._index.add(tweet_id)
+
+    def __contains__(self, tweet_id: object) -> bool:
+        return tweet_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate from the oldest to the newest id."""
+        ring = self._ring
+        for offset in range(len(ring)):
+            yield ring[(self._head + offset) % len(ring)]
+
+    def __repr__(self) -> str:
+        return f"RecentIdSet(capacity={self._capacity}, size={len(self)})"
 
 
 @dataclass(slots=True)
 class BotState:
     last_seen_id: Optional[int] = None
-    processed_ids: list[int] = field(default_factory=list)
+    processed_ids: RecentIdSet = field(default_factory=RecentIdSet)
 
 
 @dataclass(slots=True)
@@ -22,46 +78,135 @@ class OAuth2Token:
 
     @property
     def is_expired(self) -> bool:
+        return self.expires_within(30)  # small buffer to avoid edge cases
+
+    def expires_within(self, seconds: float) -> bool:
         if self.expires_at is None:
             return False
-        return time.time() >= self.expires_at - 30  # small buffer to avoid edge cases
+        return time.time() >= self.expires_at - seconds
 
 
 class Storage:
-    def __init__(self, state_path: str, token_path: str, *, max_history: int = 500) -> None:
+    """Bot state in SQLite (WAL) plus the OAuth token as an atomically replaced JSON file.
+
+    Processed tweet ids are committed one row at a time as they are handled,
+    so a crash mid-cycle loses at most the id being written; the bot loads
+    the history once and then only writes new ids and ``last_seen_id``.
+    Rows beyond ``max_history`` are compacted away every tenth of the
+    history. A legacy ``state_<handle>.json`` next to the database is
+    imported once.
+    """
+
+    def __init__(self, state_path: str, token_path: str, *, max_history: int = DEFAULT_HISTORY) -> None:
         self._state_path = Path(state_path)
         self._token_path = Path(token_path)
         self._max_history = max_history
+        self._unpruned = 0
+        self._conn: Optional[sqlite3.Connection] = None
         self._state_path.parent.mkdir(parents=True, exist_ok=True)
         self._token_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Bot state helpers -------------------------------------------------
     def load_state(self) -> BotState:
-        if not self._state_path.exists():
-            return BotState()
+        conn = self._db()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_seen_id'").fetchone()
+        processed = conn.execute(
+            "SELECT tweet_id FROM processed ORDER BY seq DESC LIMIT ?", (self._max_history,)
+        ).fetchall()
+        return BotState(
+            last_seen_id=int(row[0]) if row and row[0] is not None else None,
+            processed_ids=RecentIdSet(
+                self._max_history,
+                (tweet_id for (tweet_id,) in reversed(processed)),
+            ),
+        )
+
+    def mark_processed(self, tweet_id: int) -> None:
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO processed (tweet_id, processed_at) VALUES (?, ?)",
+                (tweet_id, time.time()),
+            )
+        self._unpruned += 1
+
+    def save_last_seen(self, last_seen_id: Optional[int]) -> None:
+        """Persist the search cursor; processed ids are already written by ``mark_processed``."""
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_seen_id', ?)",
+                (str(last_seen_id) if last_seen_id is not None else None,),
+            )
+            if self._unpruned >= max(1, self._max_history // 10):
+                self._compact(conn)
+
+    def save_state(self, state: BotState) -> None:
+        """Write a whole state at once (legacy import); the bot loop uses ``save_last_seen``."""
+        with self._db() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO processed (tweet_id, processed_at) VALUES (?, ?)",
+                [(tweet_id, time.time()) for tweet_id in state.processed_ids],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_seen_id', ?)",
+                (str(state.last_seen_id) if state.last_seen_id is not None else None,),
+            )
+            self._compact(conn)
+
+    def _compact(self, conn: sqlite3.Connection) -> None:
+        # Keep only the newest max_history ids.
+        conn.execute(
+            "DELETE FROM processed WHERE seq <= ("
+            " SELECT seq FROM processed ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+            (self._max_history,),
+        )
+        self._unpruned = 0
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self._state_path)
+            # WAL + synchronous=NORMAL: each commit is a cheap WAL append that
+            # survives a process crash without rewriting the whole state.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " tweet_id INTEGER NOT NULL UNIQUE,"
+                " processed_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._import_legacy_state()
+        return self._conn
+
+    def _import_legacy_state(self) -> None:
+        legacy_path = self._state_path.with_suffix(".json")
+        if legacy_path == self._state_path or not legacy_path.exists():
+            return
         try:
-            payload = json.loads(self._state_path.read_text(encoding="utf-8"))
+            payload = json.loads(legacy_path.read_text(encoding="utf-8"))
         except json.JSONDecodeError:
-            return BotState()
+            payload = {}
         last_seen = payload.get("last_seen_id")
-        processed = payload.get("processed_ids", [])
         cleaned: list[int] = []
-        for item in processed:
+        for item in payload.get("processed_ids", []):
             if isinstance(item, int):
                 cleaned.append(item)
             elif isinstance(item, str) and item.isdigit():
                 cleaned.append(int(item))
-        return BotState(
-            last_seen_id=int(last_seen) if last_seen is not None else None,
-            processed_ids=cleaned,
+        self.save_state(
+            BotState(
+                last_seen_id=int(last_seen) if last_seen is not None else None,
+                processed_ids=RecentIdSet(self._max_history, cleaned),
+            )
         )
-
-    def save_state(self, state: BotState) -> None:
-        payload = {
-            "last_seen_id": state.last_seen_id,
-            "processed_ids": state.processed_ids[-self._max_history :],
-        }
-        self._state_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        legacy_path.rename(legacy_path.with_suffix(".json.migrated"))
 
     # Token helpers -----------------------------------------------------
     def load_token(self) -> Optional[OAuth2Token]:
@@ -90,4 +235,13 @@ class Storage:
             "expires_at": token.expires_at,
             "scope": token.scope,
         }
-        self._token_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        _atomic_write(self._token_path, json.dumps(payload, indent=2))
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,258 @@
+"""Multi-process ``run-all``: shard accounts across supervised worker processes."""
+
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .metrics import REGISTRY, MetricsServer
+
+
+logger = logging.getLogger(__name__)
+_POLL_SECONDS = 0.5
+_METRICS_PUSH_SECONDS = 5.0
+_SHUTDOWN_GRACE_SECONDS = 60.0
+
+
+@dataclass(slots=True)
+class WorkerOptions:
+    dry_run: bool = False
+    log_level: str = "INFO"
+    trace_file: Optional[str] = None
+
+
+@dataclass(slots=True)
+class _WorkerSlot:
+    index: int
+    handles: list[str]
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    next_start_at: float = 0.0
+    finished: bool = False
+    metrics: dict = field(default_factory=dict)
+
+
+def shard_handles(handles: list[str], workers: int) -> list[list[str]]:
+    """Split handles round-robin into at most ``workers`` non-empty shards."""
+    count = max(1, min(workers, len(handles)))
+    return [handles[index::count] for index in range(count)]
+
+
+class Supervisor:
+    """Run each shard of accounts in its own process and keep it alive.
+
+    Workers that exit with an error are restarted with exponential backoff
+    (reset once a worker stays up for ``stable_seconds``). Worker log records
+    and metric snapshots are forwarded to this process, which owns the
+    console output and the ``/metrics`` endpoint. Ctrl+C asks every worker
+    to finish its current cycle and exit.
+    """
+
+    def __init__(
+        self,
+        handles: list[str],
+        *,
+        workers: int,
+        options: WorkerOptions,
+        metrics_port: Optional[int] = None,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        stable_seconds: float = 60.0,
+    ) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = [_WorkerSlot(index, shard) for index, shard in enumerate(shard_handles(handles, workers))]
+        self._options = options
+        self._metrics_port = metrics_port
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._stable_seconds = stable_seconds
+        self._stop = self._context.Event()
+        self._log_queue = self._context.Queue()
+        self._metrics_queue = self._context.Queue()
+
+    @property
+    def shards(self) -> list[list[str]]:
+        return [list(slot.handles) for slot in self._slots]
+
+    def run(self) -> None:
+        listener = logging.handlers.QueueListener(
+            self._log_queue, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        listener.start()
+        try:
+            asyncio.run(self._supervise())
+        finally:
+            self._shutdown()
+            listener.stop()
+
+    async def _supervise(self) -> None:
+        server = MetricsServer(self._metrics_port) if self._metrics_port is not None else None
+        if server is not None:
+            await server.start()
+        try:
+            while not all(slot.finished for slot in self._slots):
+                now = time.monotonic()
+                for slot in self._slots:
+                    self._check(slot, now)
+                self._drain_metrics()
+                await asyncio.sleep(_POLL_SECONDS)
+        finally:
+            if server is not None:
+                await server.aclose()
+
+    def _check(self, slot: _WorkerSlot, now: float) -> None:
+        process = slot.process
+        if slot.finished or (process is not None and process.is_alive()):
+            return
+        if process is not None:
+            process.join()
+            slot.process = None
+            if process.exitcode == 0:
+                logger.info("Worker %s (%s) exited", slot.index, _handles_label(slot.handles))
+                slot.finished = True
+                return
+            uptime = now - slot.started_at
+            if uptime >= self._stable_seconds:
+                slot.restarts = 0
+            delay = min(self._max_delay, self._base_delay * (2**slot.restarts))
+            slot.restarts += 1
+            slot.next_start_at = now + delay
+            logger.warning(
+                "Worker %s (%s) died with exit code %s after %.0f seconds; restarting in %.1f seconds",
+                slot.index,
+                _handles_label(slot.handles),
+                process.exitcode,
+                uptime,
+                delay,
+            )
+            return
+        if now >= slot.next_start_at:
+            self._start(slot, now)
+
+    def _start(self, slot: _WorkerSlot, now: float) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(slot.index, slot.handles, self._options, self._log_queue, self._metrics_queue, self._stop),
+            name=f"bot-worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = now
+        logger.info("Started worker %s (pid %s) for %s", slot.index, process.pid, _handles_label(slot.handles))
+
+    def _drain_metrics(self) -> None:
+        updated = False
+        while True:
+            try:
+                index, snapshot = self._metrics_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._slots[index].metrics = snapshot
+            updated = True
+        if updated:
+            REGISTRY.merge(slot.metrics for slot in self._slots)
+
+    def _shutdown(self) -> None:
+        self._stop.set()
+        deadline = time.monotonic() + _SHUTDOWN_GRACE_SECONDS
+        running = [slot for slot in self._slots if slot.process is not None]
+        # Keep draining while waiting: a worker cannot exit until its last
+        # snapshot has been flushed through the queue.
+        while running and time.monotonic() < deadline:
+            self._drain_metrics()
+            for slot in running:
+                slot.process.join(_POLL_SECONDS / len(running))
+            running = [slot for slot in running if slot.process.is_alive()]
+        for slot in running:
+            logger.warning("Worker %s did not stop in time; terminating", slot.index)
+            slot.process.terminate()
+            slot.process.join(5)
+        self._drain_metrics()
+
+
+def _handles_label(handles: list[str]) -> str:
+    return ", ".join(f"@{handle}" for handle in handles)
+
+
+def _worker_trace_file(trace_file: Optional[str], index: int) -> Optional[str]:
+    if not trace_file:
+        return None
+    path = Path(trace_file)
+    return str(path.with_name(f"{path.stem}.worker{index}{path.suffix}"))
+
+
+def _worker_main(
+    index: int,
+    handles: list[str],
+    options: WorkerOptions,
+    log_queue: "multiprocessing.Queue",
+    metrics_queue: "multiprocessing.Queue",
+    stop: "multiprocessing.synchronize.Event",
+) -> None:
+    # Ctrl+C reaches the whole process group; only the supervisor reacts to it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(getattr(logging, options.log_level.upper(), logging.INFO))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        asyncio.run(_run_worker(index, handles, options, metrics_queue, stop))
+    except Exception:
+        logging.getLogger(__name__).exception("Worker %s crashed", index)
+        sys.exit(1)
+
+
+async def _run_worker(
+    index: int,
+    handles: list[str],
+    options: WorkerOptions,
+    metrics_queue: "multiprocessing.Queue",
+    stop: "multiprocessing.synchronize.Event",
+) -> None:
+    from .config import AppSettings, get_bots_config
+    from .engine import BotEngine
+
+    config = get_bots_config()
+    engine = BotEngine(
+        dry_run=options.dry_run,
+        http_config=config.http if config is not None else None,
+        trace_file=_worker_trace_file(options.trace_file, index),
+        # Let the supervisor restart the whole shard instead of running on
+        # with a dead account.
+        stop_on_crash=True,
+    )
+    for handle in handles:
+        engine.add_bot(AppSettings.from_env(handle=handle))
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, engine.stop)
+    except NotImplementedError:  # pragma: no cover - Windows
+        pass
+
+    async def watch() -> None:
+        last_push = 0.0
+        while not stop.is_set():
+            if time.monotonic() - last_push >= _METRICS_PUSH_SECONDS:
+                metrics_queue.put((index, REGISTRY.snapshot()))
+                last_push = time.monotonic()
+            await asyncio.sleep(_POLL_SECONDS)
+        engine.stop()
+
+    watcher = asyncio.create_task(watch(), name=f"worker-{index}-watch")
+    try:
+        await engine.run()
+    finally:
+        watcher.cancel()
+        metrics_queue.put((index, REGISTRY.snapshot()))
+    if engine.crashed:
+        # A zero exit code would mark the worker finished and never restart it.
+        raise RuntimeError(f"bot tasks crashed: {', '.join(engine.crashed)}")
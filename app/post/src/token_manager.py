@@ -0,0 +1,179 @@
+"""OAuth 2.0 access-token lifecycle shared by every request of an account."""
+
+import asyncio
+import base64
+import logging
+import time
+from typing import Optional
+
+import httpx
+
+from .config import TwitterSettings
+from .metrics import TOKEN_REFRESHES
+from .storage import OAuth2Token, Storage
+
+
+logger = logging.getLogger(__name__)
+_DEFAULT_TIMEOUT = httpx.Timeout(timeout=20.0, read=30.0)
+_RETRY_DELAY_SECONDS = 30.0
+
+
+class TokenManager:
+    """Refresh the access token ahead of ``expires_at`` and coalesce refreshes.
+
+    Once an expiry is known, a single background task wakes up
+    ``refresh_margin`` seconds before it so requests rarely see a stale
+    token. Network errors and 5xx are retried every 30 seconds; a 4xx such as
+    a revoked refresh token parks the loop until a later refresh succeeds.
+    Concurrent callers that need a refresh (proactive or after a 401) share a
+    single token request.
+    """
+
+    def __init__(
+        self,
+        settings: TwitterSettings,
+        storage: Storage,
+        http: httpx.AsyncClient,
+        *,
+        refresh_margin: float = 300.0,
+    ) -> None:
+        self._settings = settings
+        self._storage = storage
+        self._http = http
+        self._refresh_margin = refresh_margin
+        self._token_url = f"{settings.api_base.rstrip('/')}/oauth2/token"
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+        self._refreshed = asyncio.Event()
+        token = storage.load_token()
+        if token is None:
+            token = OAuth2Token(
+                access_token=settings.access_token,
+                refresh_token=settings.refresh_token,
+            )
+            storage.save_token(token)
+        self._token = token
+        self.refresh_count = 0
+
+    @property
+    def token(self) -> OAuth2Token:
+        return self._token
+
+    async def access_token(self) -> str:
+        """Return a usable access token, refreshing first if it is about to expire."""
+        self._ensure_background()
+        token = self._token
+        if token.expires_within(self._refresh_margin):
+            await self.refresh(stale=token)
+        if not self._token.access_token:
+            raise RuntimeError("Twitter access token not available")
+        return self._token.access_token
+
+    async def refresh(self, *, stale: Optional[OAuth2Token] = None) -> OAuth2Token:
+        """Refresh the token unless another caller already replaced ``stale``."""
+        async with self._lock:
+            if stale is not None and self._token is not stale:
+                return self._token
+            token = self._token
+            if not token.refresh_token:
+                raise RuntimeError("Refresh token not available; cannot refresh access token")
+            self._token = await self._request_refresh(token)
+            self._storage.save_token(self._token)
+            self._refreshed.set()
+            self._ensure_background()
+            self.refresh_count += 1
+            TOKEN_REFRESHES.inc(handle=self._settings.handle.lower().lstrip("@"))
+            logger.info("Obtained refreshed access token for @%s", self._settings.handle)
+            return self._token
+
+    async def aclose(self) -> None:
+        if self._background is not None:
+            self._background.cancel()
+            try:
+                await self._background
+            except asyncio.CancelledError:
+                pass
+            self._background = None
+
+    def _ensure_background(self) -> None:
+        # Without an expiry there is nothing to schedule; the 401 path refreshes
+        # and the loop starts once a refresh reports ``expires_in``.
+        if self._background is None and self._token.expires_at is not None:
+            self._background = asyncio.create_task(
+                self._refresh_loop(), name=f"token-refresh-{self._settings.handle.lower()}"
+            )
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            token = self._token
+            if token.expires_at is None:
+                # A refresh came back without an expiry; wait for the next one.
+                self._refreshed.clear()
+                await self._refreshed.wait()
+                continue
+            delay = token.expires_at - self._refresh_margin - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.refresh(stale=token)
+            except Exception as exc:  # pragma: no cover - network interaction
+                if _is_permanent(exc):
+                    # A revoked or missing refresh token will not recover by
+                    # retrying; wait until another refresh succeeds.
+                    logger.error(
+                        "Background token refresh for @%s rejected: %s; stopping until the account is re-authorized",
+                        self._settings.handle,
+                        exc,
+                    )
+                    self._refreshed.clear()
+                    await self._refreshed.wait()
+                    continue
+                logger.warning(
+                    "Background token refresh for @%s failed: %s; retrying in %.0f seconds",
+                    self._settings.handle,
+                    exc,
+                    _RETRY_DELAY_SECONDS,
+                )
+                await asyncio.sleep(_RETRY_DELAY_SECONDS)
+
+    async def _request_refresh(self, token: OAuth2Token) -> OAuth2Token:
+        auth_value = base64.b64encode(
+            f"{self._settings.client_id}:{self._settings.client_secret}".encode("utf-8")
+        ).decode("ascii")
+
+        data = {
+            "grant_type": "refresh_token",
+            "refresh_token": token.refresh_token,
+        }
+        if self._settings.scopes:
+            data["scope"] = " ".join(self._settings.scopes)
+
+        response = await self._http.post(
+            self._token_url,
+            data=data,
+            headers={
+                "Authorization": f"Basic {auth_value}",
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+            timeout=_DEFAULT_TIMEOUT,
+        )
+        if response.status_code >= 400:
+            logger.error("Failed to refresh Twitter token: %s", response.text)
+            response.raise_for_status()
+
+        payload = response.json()
+        expires_in = payload.get("expires_in")
+        return OAuth2Token(
+            access_token=payload.get("access_token", token.access_token),
+            refresh_token=payload.get("refresh_token", token.refresh_token),
+            expires_at=(time.time() + float(expires_in)) if expires_in else None,
+            scope=payload.get("scope"),
+        )
+
+
+def _is_permanent(exc: Exception) -> bool:
+    """True for refresh failures that retrying cannot fix (4xx such as ``invalid_grant``)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return 400 <= status < 500 and status not in (408, 429)
+    return isinstance(exc, RuntimeError)
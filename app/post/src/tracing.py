@@ -0,0 +1,198 @@
+"""Lightweight tracing with OpenTelemetry-shaped spans and a JSON-lines exporter.
+
+Spans are only recorded once :func:`configure` has been called; until then
+:func:`span` hands out a shared no-op span, so instrumented hot paths cost a
+context-manager entry and nothing else. Each exported line is one span in
+the OTLP/JSON field layout (``traceId``, ``spanId``, ``startTimeUnixNano`` …).
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_ns: int = 0
+    end_ns: Optional[int] = None
+    attributes: dict[str, object] = field(default_factory=dict)
+    links: list[tuple[str, str]] = field(default_factory=list)
+    status: int = _STATUS_UNSET
+    status_message: str = ""
+    recording: bool = True
+
+    def set_attribute(self, key: str, value: object) -> None:
+        if self.recording:
+            self.attributes[key] = value
+
+    def add_link(self, other: "Span") -> None:
+        if self.recording and other.recording:
+            self.links.append((other.trace_id, other.span_id))
+
+    def set_error(self, message: str) -> None:
+        if self.recording:
+            self.status = _STATUS_ERROR
+            self.status_message = message
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if not self.recording or self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self) -> dict[str, object]:
+        payload: dict[str, object] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id:
+            payload["parentSpanId"] = self.parent_span_id
+        if self.links:
+            payload["links"] = [{"traceId": trace_id, "spanId": span_id} for trace_id, span_id in self.links]
+        if self.status_message:
+            payload["status"] = {"code": self.status, "message": self.status_message}
+        return payload
+
+
+class JsonLinesExporter:
+    """Append finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self._handle: Optional[IO[str]] = open(target, "a", encoding="utf-8")
+        self.exported = 0
+
+    def export(self, span: Span) -> None:
+        if self._handle is None:
+            return
+        self._handle.write(json.dumps(span.to_dict(), ensure_ascii=False, separators=(",", ":")))
+        self._handle.write("\n")
+        self.exported += 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+_NOOP_SPAN = Span(name="", trace_id="", span_id="", recording=False)
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_exporter: Optional[JsonLinesExporter] = None
+
+
+def configure(path: str) -> None:
+    """Start exporting spans to ``path`` (JSON lines, appended)."""
+    global _exporter
+    shutdown()
+    _exporter = JsonLinesExporter(path)
+    logger.info("Writing trace spans to %s", path)
+
+
+def shutdown() -> None:
+    global _exporter
+    if _exporter is not None:
+        logger.info("Exported %s trace spans", _exporter.exported)
+        _exporter.close()
+        _exporter = None
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def trace_id_for(tweet_id: int) -> str:
+    """Stable trace id for a tweet, so every cycle that touches it lands in one trace."""
+    return hashlib.blake2b(str(tweet_id).encode("ascii"), digest_size=16).hexdigest()
+
+
+def start_span(
+    name: str,
+    *,
+    parent: Optional[Span] = None,
+    trace_id: Optional[str] = None,
+    attributes: Optional[dict[str, object]] = None,
+    start_ns: Optional[int] = None,
+) -> Span:
+    """Create a span without making it current; the caller must ``end()`` it.
+
+    Without an explicit ``parent`` or ``trace_id`` the span joins the current
+    span's trace, or starts a new trace when there is none.
+    """
+    if _exporter is None:
+        return _NOOP_SPAN
+    if parent is None and trace_id is None:
+        parent = _current.get()
+    if parent is not None and not parent.recording:
+        parent = None
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else (trace_id or os.urandom(16).hex()),
+        span_id=os.urandom(8).hex(),
+        parent_span_id=parent.span_id if parent is not None else None,
+        start_ns=start_ns if start_ns is not None else time.time_ns(),
+        attributes=dict(attributes or {}),
+    )
+
+
+@contextmanager
+def span(
+    name: str,
+    *,
+    parent: Optional[Span] = None,
+    trace_id: Optional[str] = None,
+    attributes: Optional[dict[str, object]] = None,
+) -> Iterator[Span]:
+    """Run the block inside a new current span; exceptions mark it as an error."""
+    if _exporter is None:
+        yield _NOOP_SPAN
+        return
+    active = start_span(name, parent=parent, trace_id=trace_id, attributes=attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as exc:
+        active.set_error(f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _current.reset(token)
+        active.end()
+
+
+def _attribute(key: str, value: object) -> dict[str, object]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
@@ -0,0 +1,103 @@
+"""Process-wide HTTP connection pool shared by Twitter and OpenRouter clients."""
+
+import atexit
+import importlib.util
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from .config import HttpConfig
+
+
+logger = logging.getLogger(__name__)
+_DEFAULT_TIMEOUT = httpx.Timeout(timeout=20.0, read=30.0)
+_sync_client: Optional[httpx.Client] = None
+
+
+@dataclass(slots=True)
+class PoolMetrics:
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+
+    @property
+    def reused_requests(self) -> int:
+        return max(0, self.requests - self.connections_opened)
+
+    @property
+    def reuse_ratio(self) -> float:
+        if not self.requests:
+            return 0.0
+        return self.reused_requests / self.requests
+
+
+def _http2_available(requested: bool) -> bool:
+    if not requested:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _limits(config: HttpConfig) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections,
+        keepalive_expiry=config.keepalive_expiry_seconds,
+    )
+
+
+class HttpPool:
+    """One ``httpx.AsyncClient`` for every account in the process.
+
+    Authorization headers are passed per request, so accounts share TCP/TLS
+    connections (multiplexed over HTTP/2 when available) without sharing
+    credentials. Connection reuse is tracked through httpcore trace events.
+    """
+
+    def __init__(self, config: Optional[HttpConfig] = None) -> None:
+        config = config or HttpConfig()
+        self.metrics = PoolMetrics()
+        self.client = httpx.AsyncClient(
+            http2=_http2_available(config.http2),
+            timeout=_DEFAULT_TIMEOUT,
+            limits=_limits(config),
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def aclose(self) -> None:
+        metrics = self.metrics
+        logger.info(
+            "HTTP pool: %s requests over %s connections (%.0f%% reused)",
+            metrics.requests,
+            metrics.connections_opened,
+            metrics.reuse_ratio * 100,
+        )
+        await self.client.aclose()
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.metrics.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.metrics.tls_handshakes += 1
+
+
+def shared_sync_client() -> httpx.Client:
+    """Return the process-wide blocking client used by one-shot CLI helpers."""
+    global _sync_client
+    if _sync_client is None:
+        config = HttpConfig()
+        _sync_client = httpx.Client(
+            http2=_http2_available(config.http2),
+            timeout=_DEFAULT_TIMEOUT,
+            limits=_limits(config),
+        )
+        atexit.register(_sync_client.close)
+    return _sync_client
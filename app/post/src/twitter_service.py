@@ -1,21 +1,25 @@
 """Twitter API integration using OAuth 2.0 user context tokens."""
 
-import base64
+import asyncio
 import logging
 import time
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import AsyncIterator, Iterable, Optional
 
 import httpx
 
+from . import tracing
 from .config import TwitterSettings
-from .storage import OAuth2Token, Storage
+from .metrics import TWITTER_LATENCY, TWITTER_RESPONSES
+from .rate_limit import RateLimitBudget, RateLimiter
+from .storage import Storage
+from .token_manager import TokenManager
 
 
 logger = logging.getLogger(__name__)
-_API_BASE = "https://api.twitter.com/2"
-_TOKEN_URL = "https://api.twitter.com/2/oauth2/token"
 _DEFAULT_TIMEOUT = httpx.Timeout(timeout=20.0, read=30.0)
+SEARCH_ENDPOINT = "GET /2/tweets/search/recent"
+POST_ENDPOINT = "POST /2/tweets"
 
 
 @dataclass(slots=True)
@@ -41,149 +45,262 @@ class Tweet:
 
 
 class TwitterClient:
-    def __init__(self, settings: TwitterSettings, storage: Storage) -> None:
+    def __init__(
+        self,
+        settings: TwitterSettings,
+        storage: Storage,
+        *,
+        http: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
         self._settings = settings
-        self._storage = storage
-        self._token = storage.load_token()
-        if self._token is None:
-            self._token = OAuth2Token(
-                access_token=settings.access_token,
-                refresh_token=settings.refresh_token,
-            )
-            self._storage.save_token(self._token)
-        self._http = httpx.Client(timeout=_DEFAULT_TIMEOUT)
+        self._account_key = settings.handle.lower().lstrip("@")
+        self._api_base = settings.api_base.rstrip("/")
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._owns_http = http is None
+        self._http = http if http is not None else httpx.AsyncClient(timeout=_DEFAULT_TIMEOUT)
+        self._tokens = TokenManager(settings, storage, self._http)
 
-    def fetch_recent_tweets(
+    @property
+    def search_query(self) -> str:
+        return self._settings.search_query
+
+    @property
+    def tokens(self) -> TokenManager:
+        return self._tokens
+
+    async def aclose(self) -> None:
+        await self._tokens.aclose()
+        if self._owns_http:
+            await self._http.aclose()
+
+    async def fetch_recent_tweets(
         self,
         max_results: int,
         since_id: Optional[int] = None,
+        *,
+        max_pages: int = 1,
+        page_size: int = 100,
     ) -> list[Tweet]:
-        max_results = max(10, min(max_results, 100))
-        params = {
-            "query": self._settings.search_query,
-            "max_results": max_results,
-            "tweet.fields": "author_id,lang,created_at,public_metrics",
-            "expansions": "author_id",
-            "user.fields": "username",
-            "sort_order": "relevancy",
-        }
-        if since_id:
-            params["since_id"] = str(since_id)
-
-        response = self._request("GET", f"{_API_BASE}/tweets/search/recent", params=params)
-        body = response.json()
-        data = body.get("data", [])
-        if not data:
-            return []
-
-        includes = body.get("includes", {})
-        users = {user["id"]: user for user in includes.get("users", [])}
-        tweets: list[Tweet] = []
-        for item in data:
-            author = users.get(item.get("author_id"), {})
-            handle = author.get("username", "unknown")
-            tweet_id = int(item["id"])
-            metrics = item.get("public_metrics") or {}
-            tweets.append(
-                Tweet(
-                    id=tweet_id,
-                    text=item.get("text", ""),
-                    author_handle=handle,
-                    url=f"https://twitter.com/{handle}/status/{tweet_id}",
-                    like_count=int(metrics.get("like_count", 0)),
-                    retweet_count=int(metrics.get("retweet_count", 0)),
-                    reply_count=int(metrics.get("reply_count", 0)),
-                    quote_count=int(metrics.get("quote_count", 0)),
-                )
+        tweets = [
+            tweet
+            async for tweet in self.iter_recent_tweets(
+                max_tweets=max_results,
+                since_id=since_id,
+                max_pages=max_pages,
+                page_size=page_size,
             )
+        ]
         tweets.sort(key=lambda tweet: (tweet.popularity_score, tweet.id), reverse=True)
         return tweets
 
-    def post_reply(self, tweet_id: int, text: str) -> None:
+    async def iter_recent_tweets(
+        self,
+        *,
+        max_tweets: int,
+        since_id: Optional[int] = None,
+        max_pages: int = 1,
+        page_size: int = 100,
+    ) -> AsyncIterator[Tweet]:
+        async for page in self.iter_recent_pages(
+            max_tweets=max_tweets, since_id=since_id, max_pages=max_pages, page_size=page_size
+        ):
+            for tweet in page:
+                yield tweet
+
+    async def iter_recent_pages(
+        self,
+        *,
+        max_tweets: int,
+        since_id: Optional[int] = None,
+        max_pages: int = 1,
+        page_size: int = 100,
+    ) -> AsyncIterator[list[Tweet]]:
+        """Yield search results page by page, following ``meta.next_token``.
+
+        Each request asks for up to ``page_size`` tweets (10-100). Stops after
+        ``max_pages`` pages or ``max_tweets`` tweets, whichever comes first.
+        A failure on a later page ends the stream with a warning instead of
+        discarding the tweets already yielded.
+        """
+        remaining = max_tweets
+        next_token: Optional[str] = None
+        for page in range(max(1, max_pages)):
+            if remaining <= 0:
+                return
+            params = {
+                "query": self._settings.search_query,
+                "max_results": max(10, min(remaining, page_size, 100)),
+                "tweet.fields": "author_id,lang,created_at,public_metrics",
+                "expansions": "author_id",
+                "user.fields": "username",
+                "sort_order": "relevancy",
+            }
+            if since_id:
+                params["since_id"] = str(since_id)
+            if next_token:
+                params["next_token"] = next_token
+
+            try:
+                response = await self._request(
+                    "GET", f"{self._api_base}/tweets/search/recent", params=params
+                )
+            except httpx.HTTPError:
+                if page == 0:
+                    raise
+                logger.warning("Stopping pagination after %s pages; next page request failed", page)
+                return
+            body = response.json()
+            tweets = _parse_tweets(body)[:remaining]
+            remaining -= len(tweets)
+            if tweets:
+                yield tweets
+            next_token = (body.get("meta") or {}).get("next_token")
+            if not next_token:
+                return
+
+    async def post_reply(self, tweet_id: int, text: str) -> None:
         payload = {
             "text": text,
             "reply": {"in_reply_to_tweet_id": str(tweet_id)},
         }
-        self._request("POST", f"{_API_BASE}/tweets", json=payload)
+        # No client-side retries: the bot's outbox owns every write retry, so a
+        # 429 here would otherwise be retried twice over.
+        await self._request("POST", f"{self._api_base}/tweets", json=payload, max_retries=0)
 
-    def batch_reply(self, pairs: Iterable[tuple[Tweet, str]]) -> None:
+    async def batch_reply(self, pairs: Iterable[tuple[Tweet, str]]) -> None:
         for tweet, reply in pairs:
             if not reply:
                 logger.debug("Skipping empty reply for tweet %s", tweet.id)
                 continue
             logger.info("Replying to tweet %s", tweet.url)
-            self.post_reply(tweet.id, reply)
-
-    def _request(self, method: str, url: str, *, params=None, json=None) -> httpx.Response:
-        response = self._http.request(
-            method,
-            url,
-            params=params,
-            json=json,
-            headers=self._auth_headers(),
-        )
-        if response.status_code == 401:
-            logger.info("Access token expired, attempting refresh")
-            self._refresh_token()
-            response = self._http.request(
-                method,
-                url,
-                params=params,
-                json=json,
-                headers=self._auth_headers(),
+            await self.post_reply(tweet.id, reply)
+
+    def rate_limit_budget(self, endpoint: str = SEARCH_ENDPOINT) -> Optional[RateLimitBudget]:
+        """Return the last budget Twitter reported for ``endpoint`` on this account."""
+        return self._rate_limiter.budget(self._account_key, endpoint)
+
+    async def _request(
+        self, method: str, url: str, *, params=None, json=None, max_retries: Optional[int] = None
+    ) -> httpx.Response:
+        endpoint = f"{method} {httpx.URL(url).path}"
+        with tracing.span(f"twitter {endpoint}", attributes={"bot.handle": self._account_key}) as request_span:
+            response, attempt = await self._request_with_retries(
+                method, url, endpoint, params=params, json=json, max_retries=max_retries
+            )
+            request_span.set_attribute("http.response.status_code", response.status_code)
+            request_span.set_attribute("bot.retries", attempt)
+            if response.status_code >= 400:
+                logger.error(
+                    "Twitter API error %s: %s", response.status_code, response.text
+                )
+                response.raise_for_status()
+            return response
+
+    async def _request_with_retries(
+        self, method: str, url: str, endpoint: str, *, params=None, json=None, max_retries: Optional[int] = None
+    ) -> tuple[httpx.Response, int]:
+        # 429s are retried for every method; 5xx and transport errors only for
+        # GET so a reply that may have been accepted is not posted twice.
+        retry_server_errors = method == "GET"
+        if max_retries is None:
+            max_retries = self._rate_limiter.max_retries
+        attempt = 0
+        while True:
+            with tracing.span("rate_limit.acquire"):
+                await self._rate_limiter.acquire(self._account_key, endpoint)
+            try:
+                response = await self._send(method, url, params=params, json=json)
+            except httpx.TransportError as exc:
+                if not retry_server_errors or attempt >= max_retries:
+                    raise
+                delay = self._rate_limiter.retry_delay(attempt)
+                logger.warning("Twitter request %s failed (%s); retrying in %.1f seconds", endpoint, exc, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._rate_limiter.update(self._account_key, endpoint, response)
+            retryable = response.status_code == 429 or (
+                retry_server_errors and response.status_code >= 500
             )
-        if response.status_code >= 400:
-            logger.error(
-                "Twitter API error %s: %s", response.status_code, response.text
+            if not retryable or attempt >= max_retries:
+                return response, attempt
+            delay = self._rate_limiter.retry_delay(attempt, response)
+            logger.warning(
+                "Twitter API %s returned %s; retrying in %.1f seconds",
+                endpoint,
+                response.status_code,
+                delay,
             )
-            response.raise_for_status()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send(self, method: str, url: str, *, params=None, json=None) -> httpx.Response:
+        token = self._tokens.token
+        response = await self._timed_request(method, url, params=params, json=json)
+        if response.status_code == 401:
+            logger.info("Access token rejected, attempting refresh")
+            await self._tokens.refresh(stale=token)
+            response = await self._timed_request(method, url, params=params, json=json)
+        return response
+
+    async def _timed_request(self, method: str, url: str, *, params=None, json=None) -> httpx.Response:
+        headers = await self._auth_headers()
+        endpoint = f"{method} {httpx.URL(url).path}"
+        started = time.perf_counter()
+        with tracing.span(
+            f"HTTP {method}",
+            attributes={"http.request.method": method, "url.full": url, "bot.endpoint": endpoint},
+        ) as attempt_span:
+            try:
+                response = await self._http.request(
+                    method,
+                    url,
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    timeout=_DEFAULT_TIMEOUT,
+                )
+            except httpx.TransportError:
+                TWITTER_RESPONSES.inc(handle=self._account_key, endpoint=endpoint, status="error")
+                raise
+            finally:
+                TWITTER_LATENCY.observe(time.perf_counter() - started, handle=self._account_key, endpoint=endpoint)
+            attempt_span.set_attribute("http.response.status_code", response.status_code)
+        TWITTER_RESPONSES.inc(handle=self._account_key, endpoint=endpoint, status=str(response.status_code))
         return response
 
-    def _auth_headers(self) -> dict[str, str]:
-        token = self._token
-        if token is None or not token.access_token:
-            raise RuntimeError("Twitter access token not available")
+    async def _auth_headers(self) -> dict[str, str]:
+        access_token = await self._tokens.access_token()
         return {
-            "Authorization": f"Bearer {token.access_token}",
+            "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
 
-    def _refresh_token(self) -> None:
-        token = self._token
-        if token is None or not token.refresh_token:
-            raise RuntimeError("Refresh token not available; cannot refresh access token")
 
-        auth_value = base64.b64encode(
-            f"{self._settings.client_id}:{self._settings.client_secret}".encode("utf-8")
-        ).decode("ascii")
+def _parse_tweets(body: dict) -> list[Tweet]:
+    data = body.get("data", [])
+    if not data:
+        return []
 
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": token.refresh_token,
-        }
-        if self._settings.scopes:
-            data["scope"] = " ".join(self._settings.scopes)
-
-        response = self._http.post(
-            _TOKEN_URL,
-            data=data,
-            headers={
-                "Authorization": f"Basic {auth_value}",
-                "Content-Type": "application/x-www-form-urlencoded",
-            },
-        )
-        if response.status_code >= 400:
-            logger.error("Failed to refresh Twitter token: %s", response.text)
-            response.raise_for_status()
-
-        payload = response.json()
-        expires_in = payload.get("expires_in")
-        new_token = OAuth2Token(
-            access_token=payload.get("access_token", token.access_token),
-            refresh_token=payload.get("refresh_token", token.refresh_token),
-            expires_at=(time.time() + float(expires_in)) if expires_in else None,
-            scope=payload.get("scope"),
+    includes = body.get("includes", {})
+    users = {user["id"]: user for user in includes.get("users", [])}
+    tweets: list[Tweet] = []
+    for item in data:
+        author = users.get(item.get("author_id"), {})
+        handle = author.get("username", "unknown")
+        tweet_id = int(item["id"])
+        metrics = item.get("public_metrics") or {}
+        tweets.append(
+            Tweet(
+                id=tweet_id,
+                text=item.get("text", ""),
+                author_handle=handle,
+                url=f"https://twitter.com/{handle}/status/{tweet_id}",
+                like_count=int(metrics.get("like_count", 0)),
+                retweet_count=int(metrics.get("retweet_count", 0)),
+                reply_count=int(metrics.get("reply_count", 0)),
+                quote_count=int(metrics.get("quote_count", 0)),
+            )
         )
-        self._token = new_token
-        self._storage.save_token(new_token)
-        logger.info("Obtained refreshed access token")
+    return tweets
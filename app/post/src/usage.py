@@ -0,0 +1,152 @@
+"""SQLite ledger of LLM token usage with hourly and daily rollups."""
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+HOUR = 3600
+DAY = 86400
+_PERIODS = {"hour": HOUR, "day": DAY}
+_KEY = ("period", "handle", "persona", "model", "operation")
+
+
+@dataclass(slots=True)
+class UsageTotals:
+    period: int
+    handle: str
+    persona: str
+    model: str
+    operation: str
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class UsageLedger:
+    """Token counts per handle, persona, model and operation (classify, generate, ...).
+
+    Calls are summed in memory and written as one row per UTC hour and one
+    per UTC day when ``flush`` runs (once per bot cycle), so the file grows
+    with the number of hours, not requests. Hourly rows older than
+    ``hourly_retention_days`` are pruned; daily rows are kept.
+    """
+
+    def __init__(self, path: str, *, hourly_retention_days: int = 14) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._hourly_retention = max(1, hourly_retention_days) * DAY
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: dict[tuple[int, str, str, str, str], list[int]] = {}
+        self._day = 0
+        self._today: dict[str, int] = {}
+
+    def record(
+        self,
+        *,
+        handle: str,
+        persona: str,
+        model: str,
+        operation: str,
+        input_tokens: int,
+        cached_tokens: int,
+        output_tokens: int,
+        now: Optional[float] = None,
+    ) -> None:
+        now = now if now is not None else time.time()
+        hour = int(now) // HOUR * HOUR
+        totals = self._pending.setdefault((hour, handle, persona, model, operation), [0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += input_tokens
+        totals[2] += cached_tokens
+        totals[3] += output_tokens
+        if handle in self._today and int(now) // DAY * DAY == self._day:
+            self._today[handle] += input_tokens + output_tokens
+
+    def tokens_today(self, handle: str, now: Optional[float] = None) -> int:
+        """Input plus output tokens spent by ``handle`` since UTC midnight."""
+        day = int(now if now is not None else time.time()) // DAY * DAY
+        if day != self._day:
+            self._day = day
+            self._today = {}
+        if handle not in self._today:
+            self.flush()
+            (tokens,) = self._db().execute(
+                "SELECT COALESCE(SUM(input_tokens + output_tokens), 0) FROM usage_day"
+                " WHERE period = ? AND handle = ?",
+                (day, handle),
+            ).fetchone()
+            self._today[handle] = int(tokens)
+        return self._today[handle]
+
+    def flush(self, now: Optional[float] = None) -> None:
+        if not self._pending:
+            return
+        now = now if now is not None else time.time()
+        rows = [(*key, *totals) for key, totals in self._pending.items()]
+        with self._db() as conn:
+            for table, size in (("usage_hour", HOUR), ("usage_day", DAY)):
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(_KEY)}, calls, input_tokens, cached_tokens, output_tokens)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    f" ON CONFLICT ({', '.join(_KEY)}) DO UPDATE SET"
+                    " calls = calls + excluded.calls,"
+                    " input_tokens = input_tokens + excluded.input_tokens,"
+                    " cached_tokens = cached_tokens + excluded.cached_tokens,"
+                    " output_tokens = output_tokens + excluded.output_tokens",
+                    [(row[0] // size * size, *row[1:]) for row in rows],
+                )
+            conn.execute("DELETE FROM usage_hour WHERE period < ?", (now - self._hourly_retention,))
+        self._pending.clear()
+
+    def rollup(self, period: str = "day", *, since: float = 0.0, handle: Optional[str] = None) -> list[UsageTotals]:
+        """Rows of the ``hour`` or ``day`` rollup starting at or after ``since``."""
+        size = _PERIODS.get(period)
+        if size is None:
+            raise ValueError(f"unknown usage period {period!r}")
+        self.flush()
+        query = f"SELECT {', '.join(_KEY)}, calls, input_tokens, cached_tokens, output_tokens FROM usage_{period}"
+        query += " WHERE period >= ?"
+        params: list[object] = [int(since) // size * size]
+        if handle is not None:
+            query += " AND handle = ?"
+            params.append(handle)
+        query += " ORDER BY period, handle, model, operation"
+        return [UsageTotals(*row) for row in self._db().execute(query, params)]
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Worker processes of run-all share one ledger file.
+            conn = sqlite3.connect(self._path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for table in ("usage_hour", "usage_day"):
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    " period INTEGER NOT NULL,"
+                    " handle TEXT NOT NULL,"
+                    " persona TEXT NOT NULL,"
+                    " model TEXT NOT NULL,"
+                    " operation TEXT NOT NULL,"
+                    " calls INTEGER NOT NULL,"
+                    " input_tokens INTEGER NOT NULL,"
+                    " cached_tokens INTEGER NOT NULL,"
+                    " output_tokens INTEGER NOT NULL,"
+                    f" PRIMARY KEY ({', '.join(_KEY)}))"
+                )
+            conn.commit()
+            self._conn = conn
+        return self._conn
@@ -0,0 +1,31 @@
+from src.dedup import CycleClusters, NearDuplicateIndex
+from src.twitter_service import Tweet
+
+
+def _tweet(tweet_id: int, text: str, likes: int = 0) -> Tweet:
+    return Tweet(id=tweet_id, text=text, author_handle="someone", url=f"https://x.com/i/{tweet_id}", like_count=likes)
+
+
+TEXT = "Is the new release compatible with the old config format?"
+
+
+def test_refetched_tweet_is_not_its_own_duplicate():
+    index = NearDuplicateIndex()
+    tweet = _tweet(1, TEXT)
+    assert CycleClusters(index).admit(tweet) is None
+    # The cycle failed before the tweet was marked processed; the next cycle sees it again.
+    assert CycleClusters(index).admit(tweet) is None
+
+
+def test_earlier_cycle_match_is_a_duplicate():
+    index = NearDuplicateIndex()
+    CycleClusters(index).admit(_tweet(1, TEXT))
+    assert CycleClusters(index).admit(_tweet(2, TEXT + "!")) == 1
+
+
+def test_more_popular_member_supersedes_leader():
+    clusters = CycleClusters(NearDuplicateIndex())
+    assert clusters.admit(_tweet(1, TEXT, likes=1)) is None
+    assert clusters.admit(_tweet(2, TEXT, likes=9)) is None
+    assert clusters.admit(_tweet(3, TEXT, likes=5)) == 2
+    assert clusters.superseded == {1}
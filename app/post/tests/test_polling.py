@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from src.polling import AdaptivePollInterval
+from src.rate_limit import RateLimitBudget
+
+
+def _poll(base: float = 100.0, *, min_seconds: float = 50.0, max_seconds: float = 200.0) -> AdaptivePollInterval:
+    return AdaptivePollInterval(base, min_seconds=min_seconds, max_seconds=max_seconds)
+
+
+@pytest.mark.parametrize(
+    ("base", "fetched", "expected"),
+    [
+        # Full fetches halve the interval but never go below the minimum.
+        (100.0, 10, 50.0),
+        (60.0, 10, 50.0),
+        # Empty fetches stretch it up to the maximum.
+        (100.0, 0, 150.0),
+        (180.0, 0, 200.0),
+        # Partial fetches keep it unchanged.
+        (100.0, 5, 100.0),
+    ],
+)
+def test_observe_clamps_to_range(base, fetched, expected):
+    assert _poll(base).observe(fetched=fetched, capacity=10) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    ("base", "min_seconds", "max_seconds", "expected"),
+    [
+        (10.0, 50.0, 200.0, 50.0),
+        (900.0, 50.0, 200.0, 200.0),
+        # An inverted range collapses to a fixed interval at the lower bound.
+        (100.0, 300.0, 120.0, 120.0),
+        # Intervals under a second are raised to one.
+        (0.0, 0.0, 0.0, 1.0),
+    ],
+)
+def test_initial_interval_is_clamped(base, min_seconds, max_seconds, expected):
+    assert _poll(base, min_seconds=min_seconds, max_seconds=max_seconds).current == expected
+
+
+@pytest.mark.parametrize(
+    ("remaining", "reset_in", "requests_per_cycle", "expected"),
+    [
+        # Empty budget: wait out the reset.
+        (0, 500.0, 1, 500.0),
+        # Empty budget whose reset already passed: no extra wait.
+        (0, -10.0, 1, 100.0),
+        # Spread the remaining requests evenly until the reset.
+        (4, 400.0, 2, 200.0),
+        # A budget that outlasts the interval does not slow polling down.
+        (100, 400.0, 1, 100.0),
+        # Unknown budget.
+        (None, 400.0, 1, 100.0),
+    ],
+)
+def test_budget_stretches_interval(remaining, reset_in, requests_per_cycle, expected):
+    budget = RateLimitBudget(limit=100, remaining=remaining, reset_at=time.time() + reset_in)
+    poll = _poll()
+    interval = poll.observe(fetched=5, capacity=10, requests_per_cycle=requests_per_cycle, budget=budget)
+    assert interval == pytest.approx(expected, abs=1.0)
+    # The budget only affects the returned sleep, not the adaptive interval itself.
+    assert poll.current == 100.0
@@ -0,0 +1,45 @@
+import pytest
+
+from src.config import PostingConfig
+from src.shaper import DEFER, DROP, POST, WriteShaper
+
+NOW = 1000.0
+CONFIG = PostingConfig(max_replies=3, window_seconds=100, reserved_replies=1, priority_score=20)
+
+
+@pytest.mark.parametrize(
+    ("config", "sent_at", "priority", "action", "delay"),
+    [
+        # Plenty of budget: everything posts.
+        (CONFIG, [], 0, POST, 0.0),
+        # Budget exhausted: wait for the oldest post to leave the window.
+        (CONFIG, [950, 960, 970], 99, DEFER, 50.0),
+        # Every post already left the window, so the budget is full again.
+        (CONFIG, [800, 850, 900], 0, POST, 0.0),
+        # Only the reserved slot left: low scores wait, high scores take it.
+        (CONFIG, [960, 970], 5, DEFER, 60.0),
+        (CONFIG, [960, 970], 20, POST, 0.0),
+        (
+            PostingConfig(max_replies=3, window_seconds=100, reserved_replies=1, low_value_action="drop"),
+            [960, 970],
+            5,
+            DROP,
+            0.0,
+        ),
+        # Disabled or zero-sized budgets never hold a reply back.
+        (PostingConfig(enabled=False), [990] * 50, 0, POST, 0.0),
+        (PostingConfig(max_replies=0), [990] * 50, 0, POST, 0.0),
+    ],
+)
+def test_decide(config, sent_at, priority, action, delay):
+    decision = WriteShaper(config, sent_at).decide(priority, now=NOW)
+    assert decision.action == action
+    assert decision.delay == pytest.approx(delay)
+
+
+def test_remaining_counts_only_posts_inside_the_window():
+    shaper = WriteShaper(CONFIG, [850, 950])
+    assert shaper.remaining(now=NOW) == 2
+    shaper.record(now=NOW)
+    assert shaper.remaining(now=NOW) == 1
+    assert WriteShaper(PostingConfig(enabled=False)).remaining(now=NOW) is None
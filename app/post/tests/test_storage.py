@@ -0,0 +1,98 @@
+import json
+import sqlite3
+
+import pytest
+
+from src.storage import RecentIdSet, Storage
+
+
+def _storage(tmp_path, max_history: int = 10) -> Storage:
+    return Storage(str(tmp_path / "state_bot.sqlite3"), str(tmp_path / "token_bot.json"), max_history=max_history)
+
+
+def _stored_ids(storage_path) -> list[int]:
+    with sqlite3.connect(storage_path) as conn:
+        return [tweet_id for (tweet_id,) in conn.execute("SELECT tweet_id FROM processed ORDER BY seq")]
+
+
+def test_recent_id_set_evicts_oldest_first():
+    ids = RecentIdSet(3, [1, 2, 3])
+    ids.add(4)
+    ids.add(5)
+    assert list(ids) == [3, 4, 5]
+    assert 1 not in ids and 2 not in ids
+    assert len(ids) == 3
+
+
+def test_recent_id_set_ignores_known_ids():
+    ids = RecentIdSet(3, [1, 2, 3])
+    ids.add(1)
+    assert list(ids) == [1, 2, 3]
+
+
+def test_recent_id_set_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        RecentIdSet(0)
+
+
+@pytest.mark.parametrize(
+    ("inserted", "expected_rows"),
+    [
+        # Below max_history // 10 new ids the table is left alone.
+        (10, list(range(1, 11))),
+        # The first compaction runs once enough ids piled up past the history.
+        (11, list(range(2, 12))),
+        (25, list(range(16, 26))),
+    ],
+)
+def test_compaction_keeps_newest_ids(tmp_path, inserted, expected_rows):
+    storage = _storage(tmp_path)
+    for tweet_id in range(1, inserted + 1):
+        storage.mark_processed(tweet_id)
+        storage.save_last_seen(tweet_id)
+    storage.close()
+    assert _stored_ids(tmp_path / "state_bot.sqlite3") == expected_rows
+
+
+def test_compaction_waits_for_a_tenth_of_the_history(tmp_path):
+    storage = _storage(tmp_path, max_history=20)
+    for tweet_id in range(1, 22):
+        storage.mark_processed(tweet_id)
+    storage.save_last_seen(21)
+    storage.mark_processed(22)
+    # One insert since the last compaction is below 20 // 10.
+    storage.save_last_seen(22)
+    storage.close()
+    assert _stored_ids(tmp_path / "state_bot.sqlite3") == list(range(2, 23))
+
+
+def test_load_state_returns_newest_history_and_cursor(tmp_path):
+    storage = _storage(tmp_path, max_history=3)
+    for tweet_id in (5, 6, 7, 8):
+        storage.mark_processed(tweet_id)
+    storage.save_last_seen(8)
+    state = storage.load_state()
+    storage.close()
+    assert state.last_seen_id == 8
+    assert list(state.processed_ids) == [6, 7, 8]
+
+
+def test_legacy_json_state_is_imported_once(tmp_path):
+    legacy = tmp_path / "state_bot.json"
+    legacy.write_text(json.dumps({"last_seen_id": 42, "processed_ids": [40, "41", "bad", 42]}), encoding="utf-8")
+    storage = _storage(tmp_path)
+    state = storage.load_state()
+    storage.close()
+    assert state.last_seen_id == 42
+    assert list(state.processed_ids) == [40, 41, 42]
+    assert not legacy.exists()
+    assert (tmp_path / "state_bot.json.migrated").exists()
+
+    # Reopening finds the migrated file renamed, so the import does not run again.
+    reopened = _storage(tmp_path)
+    reopened.mark_processed(43)
+    reopened.save_last_seen(43)
+    reopened.close()
+    again = _storage(tmp_path).load_state()
+    assert again.last_seen_id == 43
+    assert list(again.processed_ids) == [40, 41, 42, 43]